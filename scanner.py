@@ -10,20 +10,21 @@
 # Copyright (C) 2023 Beacon <beacon3d.com>
 #
 # This file may be distributed under the terms of the GNU GPLv3 license.
+import bisect
 import copy
-import importlib
 import logging
 import math
-import multiprocessing
 import os
 import queue
 import random
+import statistics
 import struct
 import threading
 import time
 import traceback
 from dataclasses import dataclass
 from enum import IntEnum
+from operator import itemgetter
 from typing import Callable, Optional, TypedDict, final
 
 import chelper
@@ -46,9 +47,16 @@ from . import (
     thermistor,
 )
 
+try:
+    import numba  # pyright: ignore[reportMissingImports]
+except ImportError:
+    numba = None
+
 DOCS_TOUCH_CALIBRATION = "https://docs.cartographer3d.com/cartographer-probe/installation-and-setup/installation/touch-based-calibration"
 DOCS_SCAN_CALIBRATION = "https://docs.cartographer3d.com/cartographer-probe/installation-and-setup/installation/scan-based-calibration"
 
+_polyval = np.polynomial.polynomial.polyval
+
 STREAM_BUFFER_LIMIT_DEFAULT = 100
 STREAM_TIMEOUT = 2.0
 
@@ -61,6 +69,9 @@ THRESHOLD_STEP_MULTIPLIER = 10
 # Require a qualified threshold to pass at 0.66 of the QUALIFY_SAMPLES
 THRESHOLD_ACCEPTANCE_FACTOR = 0.66
 
+# Fields written per sample by SCANNER_STREAM, fetched with a single C call
+STREAM_LOG_FIELDS = itemgetter("time", "data", "data_smooth", "freq", "dist", "temp")
+
 
 class TriggerMethod(IntEnum):
     SCAN = 0
@@ -85,6 +96,14 @@ def format_macro(macro: str) -> str:
     return f'<a class="command">{macro}</a>'
 
 
+def jit_kernel(fn):
+    # Compile numeric kernels with numba when it is available, otherwise
+    # they run as plain Python.
+    if numba is None:
+        return fn
+    return numba.njit(cache=True)(fn)
+
+
 @final
 class BedLeveling:
     def __init__(self, printer: Printer):
@@ -254,6 +273,7 @@ class Scanner:
         # Load models
         self.model = None
         self.models: dict[str, ScannerModel] = {}
+        self._model_names_sorted: list[str] = []
         self.model_temp_builder = ScannerTempModelBuilder.load(config)
         self.model_temp = None
         self.fmin = None
@@ -312,13 +332,18 @@ class Scanner:
         self.printer.register_event_handler(
             "klippy:mcu_identify", self._handle_mcu_identify
         )
+        self.printer.register_event_handler("klippy:ready", warm_jit_kernels)
         self._mcu.register_config_callback(self._build_config)
         self._mcu.register_response(
             self._handle_scanner_data, self.sensor.lower() + "_data"
         )
         # Register webhooks
         webhooks = self.printer.lookup_object("webhooks")
-        self._api_dump_helper = APIDumpHelper(self)
+        self._api_dump_helper = APIDumpHelper(
+            self,
+            config.getint("api_dump_batch_size", 50, minval=1),
+            config.getfloat("api_dump_max_latency", 0.1, above=0.0),
+        )
         webhooks.register_endpoint("scanner/status", self._handle_req_status)
         webhooks.register_endpoint("scanner/dump", self._handle_req_dump)
 
@@ -1658,7 +1683,7 @@ class Scanner:
             0.0,
             self.fw_version,
         )
-        self.models[self.model.name] = self.model
+        self._add_model(self.model.name, self.model)
         self.model.save()
         self._apply_threshold()
 
@@ -1700,6 +1725,11 @@ class Scanner:
             raise self.printer.config_error(
                 "Multiple Scanner models with same name '%s'" % (name,)
             )
+        self._add_model(name, model)
+
+    def _add_model(self, name: str, model: "ScannerModel"):
+        if name not in self.models:
+            bisect.insort(self._model_names_sorted, name)
         self.models[name] = model
 
     def _is_faulty_coordinate(self, x, y, add_offsets=False):
@@ -1738,21 +1768,28 @@ class Scanner:
         else:
             sample["temp"], _ = self.thermistor_override.get_temp(sample["time"])
 
-    def _enrich_sample_freq(self, sample):
-        sample["data_smooth"] = self._data_filter.value()
-        sample["freq"] = self.count_to_freq(sample["data_smooth"])
+    def _enrich_sample_freq(self, sample, data_smooth):
+        sample["data_smooth"] = data_smooth
+        sample["freq"] = self.count_to_freq(data_smooth)
         self._check_hardware(sample)
 
-    def _enrich_sample(self, sample):
-        sample["dist"] = self.freq_to_dist(sample["freq"], sample["temp"])
-        pos, vel = self._get_trapq_position(sample["time"])
+    def _enrich_samples(self, samples):
+        # Map the whole batch through the model in one vectorized call
+        dists = self.freq_to_dist_batch(
+            [s["freq"] for s in samples], [s["temp"] for s in samples]
+        )
+        if dists is None:
+            dists = [None] * len(samples)
+        for sample, dist in zip(samples, dists):
+            sample["dist"] = dist
+            pos, vel = self._get_trapq_position(sample["time"])
 
-        if pos is None:
-            return
-        if sample["dist"] is not None and self.mod_axis_twist_comp is not None:
-            sample["dist"] -= self.mod_axis_twist_comp(pos)
-        sample["pos"] = pos
-        sample["vel"] = vel
+            if pos is None:
+                continue
+            if dist is not None and self.mod_axis_twist_comp is not None:
+                sample["dist"] -= self.mod_axis_twist_comp(pos)
+            sample["pos"] = pos
+            sample["vel"] = vel
 
     def _start_streaming(self):
         if self._stream_en == 0:
@@ -1814,7 +1851,6 @@ class Scanner:
             try:
                 samples = self._stream_samples_queue.get_nowait()
                 updated_timer = False
-                last = None
                 for sample in samples:
                     if not updated_timer:
                         curtime = self.reactor.monotonic()
@@ -1841,20 +1877,23 @@ class Scanner:
                         self.measured_min = min(self.measured_min, temp)
                         self.measured_max = max(self.measured_max, temp)
 
-                    self._data_filter.update(sample["time"], sample["data"])
-                    self._enrich_sample_freq(sample)
-                    self._enrich_sample(sample)
-
+                if not samples:
+                    continue
+                smoothed = self._data_filter.update_batch(
+                    [s["time"] for s in samples], [s["data"] for s in samples]
+                )
+                for sample, data_smooth in zip(samples, smoothed):
+                    self._enrich_sample_freq(sample, data_smooth)
+                self._enrich_samples(samples)
+                for sample in samples:
                     if len(self._stream_callbacks) > 0:
                         for cb in list(self._stream_callbacks.values()):
                             cb(sample)
-                    last = sample
-                if last is not None:
-                    last = last.copy()
-                    dist = last["dist"]
-                    if dist is None or np.isinf(dist) or np.isnan(dist):
-                        del last["dist"]
-                    self.last_received_sample = last
+                last = samples[-1].copy()
+                dist = last["dist"]
+                if dist is None or np.isinf(dist) or np.isnan(dist):
+                    del last["dist"]
+                self.last_received_sample = last
             except queue.Empty:
                 return
 
@@ -1955,6 +1994,11 @@ class Scanner:
             return None
         return self.model.freq_to_dist(freq, temp)
 
+    def freq_to_dist_batch(self, freqs, temps):
+        if self.model is None:
+            return None
+        return self.model.freq_to_dist_batch(freqs, temps).tolist()
+
     def get_status(self, eventtime):
         model = None
         if self.model is not None:
@@ -2124,19 +2168,15 @@ class Scanner:
 
             def cb(sample):
                 pos = sample.get("pos", None)
-                obj = "%.4f,%d,%.2f,%.5f,%.5f,%.2f,%s,%s,%s,%s\n" % (
-                    sample["time"],
-                    sample["data"],
-                    sample["data_smooth"],
-                    sample["freq"],
-                    sample["dist"],
-                    sample["temp"],
-                    "%.3f" % (pos[0],) if pos is not None else "",
-                    "%.3f" % (pos[1],) if pos is not None else "",
-                    "%.3f" % (pos[2],) if pos is not None else "",
-                    "%.3f" % (sample["vel"],) if "vel" in sample else "",
-                )
-                f.write(obj)
+                vel = sample.get("vel", None)
+                obj = "%.4f,%d,%.2f,%.5f,%.5f,%.2f," % STREAM_LOG_FIELDS(sample)
+                if pos is not None:
+                    obj += "%.3f,%.3f,%.3f," % (pos[0], pos[1], pos[2])
+                else:
+                    obj += ",,,"
+                if vel is not None:
+                    obj += "%.3f" % (vel,)
+                f.write(obj + "\n")
 
             self._log_stream = self.streaming_session(cb, completion_cb)
             gcmd.respond_info("Scanner Streaming enabled")
@@ -2260,41 +2300,7 @@ class Scanner:
                 nb_samples=0,
             )
 
-        max_value = max(zs)
-        min_value = min(zs)
-        range_value = max_value - min_value
-        avg_value = sum(zs) / len(positions)
-        median_ = median(zs)
-
-        in_range = 0
-        early = 0
-        late = 0
-
-        for sampl in zs:
-            if abs(median_ - sampl) < 0.05:
-                in_range += 1
-            elif sampl > median_:
-                early += 1
-            else:
-                late += 1
-
-        deviation_sum = 0
-        for i in range(len(zs)):
-            deviation_sum += pow(zs[i] - avg_value, 2)
-        sigma = math.sqrt(deviation_sum / len(zs))
-
-        return ThresholdResults(
-            max_value=max_value,
-            min_value=min_value,
-            range_value=range_value,
-            avg_value=avg_value,
-            median=median_,
-            sigma=sigma,
-            in_range=in_range,
-            early=early,
-            late=late,
-            nb_samples=len(zs),
-        )
+        return summarize_samples(zs)
 
     cmd_Z_OFFSET_APPLY_PROBE_help = "Adjust the probe's z_offset"
 
@@ -2418,6 +2424,11 @@ class ScannerModel:
         self.name = name
         self.scanner = scanner
         self.poly = poly
+        # Cache the domain mapping so lookups can call polyval directly
+        # rather than going through Polynomial.__call__
+        self._dom_begin, self._dom_end = (float(v) for v in poly.domain)
+        self._map_off, self._map_scl = poly.mapparms()
+        self._coef = poly.coef
         self.min_z = min_z
         self.max_z = max_z
         self.temp = temp
@@ -2463,20 +2474,35 @@ class ScannerModel:
             )
 
     def freq_to_dist_raw(self, freq):
-        [begin, end] = self.poly.domain
         invfreq = 1 / freq
-        if invfreq > end:
+        if invfreq > self._dom_end:
             return float("inf")
-        elif invfreq < begin:
+        elif invfreq < self._dom_begin:
             return float("-inf")
         else:
-            return float(self.poly(invfreq) - self.offset)
+            x = self._map_off + self._map_scl * invfreq
+            return float(_polyval(x, self._coef) - self.offset)
 
     def freq_to_dist(self, freq, temp):
         if self.temp is not None and self.scanner.model_temp is not None:
             freq = self.scanner.model_temp.compensate(freq, temp, self.temp)
         return self.freq_to_dist_raw(freq)
 
+    def freq_to_dist_raw_batch(self, freqs):
+        with np.errstate(divide="ignore"):
+            invfreq = 1.0 / np.asarray(freqs, dtype=np.float64)
+        x = self._map_off + self._map_scl * invfreq
+        dist = _polyval(x, self._coef) - self.offset
+        dist[invfreq > self._dom_end] = np.inf
+        dist[invfreq < self._dom_begin] = -np.inf
+        return dist
+
+    def freq_to_dist_batch(self, freqs, temps):
+        model_temp = self.scanner.model_temp
+        if self.temp is not None and model_temp is not None:
+            freqs = model_temp.compensate_batch(freqs, temps, self.temp)
+        return self.freq_to_dist_raw_batch(freqs)
+
     def dist_to_freq_raw(self, dist, max_e=0.00000001):
         if dist < self.min_z or dist > self.max_z:
             msg = (
@@ -2485,16 +2511,38 @@ class ScannerModel:
             )
             raise self.scanner.printer.command_error(msg)
         dist += self.offset
-        [begin, end] = self.poly.domain
+        begin, end = self._dom_begin, self._dom_end
+        off, scl, coef = self._map_off, self._map_scl, self._coef
+        # Illinois regula falsi on the model residual, which needs far
+        # fewer polynomial evaluations than plain bisection.
+        v_begin = _polyval(off + scl * begin, coef) - dist
+        v_end = _polyval(off + scl * end, coef) - dist
+        if abs(v_begin) < max_e:
+            return float(1.0 / begin)
+        if abs(v_end) < max_e:
+            return float(1.0 / end)
+        if v_begin > 0 or v_end < 0:
+            raise self.scanner.printer.command_error("Scanner model convergence error")
+        side = 0
         for _ in range(0, 50):
-            f = (end + begin) / 2
-            v = self.poly(f)
-            if abs(v - dist) < max_e:
+            span = v_end - v_begin
+            f = begin - v_begin * (end - begin) / span if span else math.nan
+            if not begin < f < end:
+                # Flat or non-finite bracket, take a bisection step instead
+                f = (begin + end) / 2
+            v = _polyval(off + scl * f, coef) - dist
+            if abs(v) < max_e:
                 return float(1.0 / f)
-            elif v < dist:
-                begin = f
+            elif v < 0:
+                begin, v_begin = f, v
+                if side == -1:
+                    v_end /= 2
+                side = -1
             else:
-                end = f
+                end, v_end = f, v
+                if side == 1:
+                    v_begin /= 2
+                side = 1
         raise self.scanner.printer.command_error("Scanner model convergence error")
 
     def dist_to_freq(self, dist, temp, max_e=0.00000001):
@@ -2563,48 +2611,95 @@ class ScannerTempModel:
         self.b_b = b_b
         self.fmin = fmin
         self.fmin_temp = fmin_temp
+        # Hoist the terms of the compensation quadratic that only depend
+        # on the model parameters
+        self._consts = None
+        if a_a is not None and a_b is not None and b_a is not None and b_b is not None:
+            self._consts = (
+                a_a,
+                a_b,
+                b_a,
+                b_b,
+                fmin,
+                b_a**2,
+                4 * a_a,
+                a_a * b_b + a_b * b_a,
+                2 * b_a * b_b,
+                4 * a_b,
+                b_b**2,
+            )
 
     def param_linear(self, x, a, b):
         return a * x + b
 
     def compensate(self, freq, temp_source, temp_target, tctl=None):
-        if self.a_a is None or self.a_b is None or self.b_a is None or self.b_b is None:
+        if self._consts is None:
             return freq
-        A = (
-            4 * (temp_source * self.a_a) ** 2
-            + 4 * temp_source * self.a_a * self.b_a
-            + self.b_a**2
-            + 4 * self.a_a
+        return compensate_kernel(*self._consts, freq, temp_source, temp_target)
+
+    def compensate_batch(self, freqs, temp_source, temp_target):
+        freqs = np.asarray(freqs, dtype=np.float64)
+        if self._consts is None:
+            return freqs
+        (a_a, a_b, b_a, b_b, fmin, ba_sq, aa_4, cross, babb_2, ab_4, bb_sq) = (
+            self._consts
         )
-        B = (
-            8 * temp_source**2 * self.a_a * self.a_b
-            + 4 * temp_source * (self.a_a * self.b_b + self.a_b * self.b_a)
-            + 2 * self.b_a * self.b_b
-            + 4 * self.a_b
-            - 4 * (freq - self.fmin) * self.a_a
-        )
-        C = (
-            4 * (temp_source * self.a_b) ** 2
-            + 4 * temp_source * self.a_b * self.b_b
-            + self.b_b**2
-            - 4 * (freq - self.fmin) * self.a_b
-        )
-        if B**2 - 4 * A * C < 0:
-            param_c = (
-                freq
-                - self.param_linear(freq - self.fmin, self.a_a, self.a_b)
-                * temp_source**2
-                - self.param_linear(freq - self.fmin, self.b_a, self.b_b) * temp_source
-            )
-            return (
-                self.param_linear(freq - self.fmin, self.a_a, self.a_b) * temp_target**2
-                + self.param_linear(freq - self.fmin, self.b_a, self.b_b) * temp_target
-                + param_c
-            )
-        ax = (np.sqrt(B**2 - 4 * A * C) - B) / 2 / A
-        param_a = self.param_linear(ax, self.a_a, self.a_b)
-        param_b = self.param_linear(ax, self.b_a, self.b_b)
-        return param_a * (temp_target + param_b / 2 / param_a) ** 2 + ax + self.fmin
+        ts = np.asarray(temp_source, dtype=np.float64)
+        tt = np.asarray(temp_target, dtype=np.float64)
+        df = freqs - fmin
+        A = 4 * (ts * a_a) ** 2 + 4 * ts * a_a * b_a + ba_sq + aa_4
+        B = 8 * ts**2 * a_a * a_b + 4 * ts * cross + babb_2 + ab_4 - 4 * df * a_a
+        C = 4 * (ts * a_b) ** 2 + 4 * ts * a_b * b_b + bb_sq - 4 * df * a_b
+        disc = B * B - 4 * A * C
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Samples with a negative discriminant use the linear fallback,
+            # the rest use the closed form solution.
+            lin_a = self.param_linear(df, a_a, a_b)
+            lin_b = self.param_linear(df, b_a, b_b)
+            fallback = lin_a * tt**2 + lin_b * tt + (freqs - lin_a * ts**2 - lin_b * ts)
+            ax = (np.sqrt(np.maximum(disc, 0.0)) - B) / 2 / A
+            param_a = self.param_linear(ax, a_a, a_b)
+            param_b = self.param_linear(ax, b_a, b_b)
+            primary = param_a * (tt + param_b / 2 / param_a) ** 2 + ax + fmin
+        return np.where(disc < 0, fallback, primary)
+
+
+@jit_kernel
+def compensate_kernel(
+    a_a,
+    a_b,
+    b_a,
+    b_b,
+    fmin,
+    ba_sq,
+    aa_4,
+    cross,
+    babb_2,
+    ab_4,
+    bb_sq,
+    freq,
+    temp_source,
+    temp_target,
+):
+    df = freq - fmin
+    ts_sq = temp_source * temp_source
+    ts_aa = temp_source * a_a
+    ts_ab = temp_source * a_b
+    A = 4 * (ts_aa * ts_aa) + 4 * temp_source * a_a * b_a + ba_sq + aa_4
+    B = 8 * ts_sq * a_a * a_b + 4 * temp_source * cross + babb_2 + ab_4 - 4 * df * a_a
+    C = 4 * (ts_ab * ts_ab) + 4 * temp_source * a_b * b_b + bb_sq - 4 * df * a_b
+    disc = B * B - 4 * A * C
+    if disc < 0:
+        lin_a = a_a * df + a_b
+        lin_b = b_a * df + b_b
+        param_c = freq - lin_a * ts_sq - lin_b * temp_source
+        return lin_a * (temp_target * temp_target) + lin_b * temp_target + param_c
+    # Branch rather than select, so the fallback never evaluates the closed form
+    ax = (math.sqrt(disc) - B) / 2 / A
+    param_a = a_a * ax + a_b
+    param_b = b_a * ax + b_b
+    shifted = temp_target + param_b / 2 / param_a
+    return param_a * (shifted * shifted) + ax + fmin
 
 
 @final
@@ -2662,7 +2757,7 @@ class ModelManager:
         model.name = name
         model.save()
         if name != oldname:
-            self.scanner.models[name] = model
+            self.scanner._add_model(name, model)
 
     cmd_SCANNER_MODEL_REMOVE_help = "Remove saved scanner model"
 
@@ -2675,6 +2770,8 @@ class ModelManager:
         section = "scanner model " + model.name
         configfile.remove_section(section)
         _ = self.scanner.models.pop(name)
+        names = self.scanner._model_names_sorted
+        del names[bisect.bisect_left(names, name)]
         gcmd.respond_info(
             f"Model '{name}' was removed for the current session.\n"
             + f"Run {format_macro('SAVE_CONFIG')} to update the printer configuration"
@@ -2691,7 +2788,8 @@ class ModelManager:
             return
         gcmd.respond_info("List of loaded Scanner models:")
         current_model = self.scanner.model
-        for _name, model in sorted(self.scanner.models.items()):
+        for name in self.scanner._model_names_sorted:
+            model = self.scanner.models[name]
             if model == current_model:
                 gcmd.respond_info("- %s [active]" % (model.name,))
             else:
@@ -2706,31 +2804,88 @@ class AlphaBetaFilter:
 
     def reset(self):
         self.xl = None
-        self.vl = 0
+        self.vl = 0.0
         self.tl = None
 
     def update(self, time, measurement):
         if self.xl is None:
-            self.xl = measurement
+            self.xl = float(measurement)
         if self.tl is not None:
             dt = time - self.tl
         else:
-            dt = 0
+            dt = 0.0
         self.tl = time
-        xk = self.xl + self.vl * dt
-        vk = self.vl
-        rk = measurement - xk
-        xk = xk + self.alpha * rk
-        if dt > 0:
-            vk = vk + self.beta / dt * rk
-        self.xl = xk
-        self.vl = vk
-        return xk
+        self.xl, self.vl = alpha_beta_step(
+            self.alpha, self.beta, self.xl, self.vl, dt, float(measurement)
+        )
+        return self.xl
+
+    def update_batch(self, times, measurements):
+        if len(times) == 0:
+            return []
+        if self.xl is None:
+            self.xl = float(measurements[0])
+        tl = float(times[0]) if self.tl is None else self.tl
+        if numba is None:
+            # Without numba the kernel would loop over numpy scalars, which is
+            # slower than stepping through plain floats here
+            alpha, beta, xl, vl = self.alpha, self.beta, self.xl, self.vl
+            xs = []
+            for t, measurement in zip(times, measurements):
+                xl, vl = alpha_beta_step(alpha, beta, xl, vl, t - tl, measurement)
+                tl = t
+                xs.append(xl)
+            self.vl = vl
+        else:
+            xs, self.vl = alpha_beta_filter(
+                self.alpha,
+                self.beta,
+                self.xl,
+                self.vl,
+                tl,
+                np.asarray(times, dtype=np.float64),
+                np.asarray(measurements, dtype=np.float64),
+            )
+            xs = xs.tolist()
+        self.xl = float(xs[-1])
+        self.tl = float(times[-1])
+        return xs
 
     def value(self):
         return self.xl
 
 
+@jit_kernel
+def alpha_beta_step(alpha, beta, xl, vl, dt, measurement):
+    xk = xl + vl * dt
+    rk = measurement - xk
+    xk = xk + alpha * rk
+    vk = vl
+    if dt > 0:
+        vk = vk + beta / dt * rk
+    return xk, vk
+
+
+@jit_kernel
+def alpha_beta_filter(alpha, beta, xl, vl, tl, times, measurements):
+    xs = np.empty(len(times))
+    for i in range(len(times)):
+        xl, vl = alpha_beta_step(alpha, beta, xl, vl, times[i] - tl, measurements[i])
+        tl = times[i]
+        xs[i] = xl
+    return xs, vl
+
+
+def warm_jit_kernels():
+    # Compile (or load from numba's cache) the jitted kernels at startup, so
+    # the first streamed batch doesn't stall the reactor on it.
+    if numba is None:
+        return
+    alpha_beta_step(0.5, 1e-5, 0.0, 0.0, 0.0, 0.0)
+    alpha_beta_filter(0.5, 1e-5, 0.0, 0.0, 0.0, np.zeros(1), np.zeros(1))
+    compensate_kernel(*([1.0] * 14))
+
+
 class StreamingHelper:
     def __init__(self, scanner, callback, completion_callback, latency):
         self.scanner = scanner
@@ -2777,11 +2932,14 @@ class StopStreaming(Exception):
 
 
 class APIDumpHelper:
-    def __init__(self, scanner):
+    def __init__(self, scanner, batch_hi=50, max_latency_s=0.1):
         self.scanner = scanner
+        self.batch_hi = batch_hi
+        self.max_latency_s = max_latency_s
         self.clients = {}
         self.stream = None
         self.buffer = []
+        self._batch_start = 0.0
         self.fields = ["dist", "temp", "pos", "freq", "vel", "time"]
 
     def _start_stop(self):
@@ -2792,21 +2950,35 @@ class APIDumpHelper:
             self.stream = None
 
     def _cb(self, sample):
-        tmp = [sample.get(key, None) for key in self.fields]
-        self.buffer.append(tmp)
-        if len(self.buffer) > 50:
+        buffer = self.buffer
+        if not buffer:
+            self._batch_start = sample["time"]
+        buffer.append([sample.get(key, None) for key in self.fields])
+        # Flush on a full batch, or when a slow stream has waited too long.
+        # The wait is measured with the sample timestamps that are already at
+        # hand rather than reading the clock for every sample.
+        if (
+            len(buffer) >= self.batch_hi
+            or sample["time"] - self._batch_start > self.max_latency_s
+        ):
             self._update_clients()
 
     def _update_clients(self):
-        for cconn, template in list(self.clients.items()):
+        params = self.buffer
+        self.buffer = []
+        clients = self.clients
+        to_remove = []
+        for cconn, template in clients.items():
             if cconn.is_closed():
-                del self.clients[cconn]
-                self._start_stop()
+                to_remove.append(cconn)
                 continue
             tmp = dict(template)
-            tmp["params"] = self.buffer
+            tmp["params"] = params
             cconn.send(tmp)
-        self.buffer = []
+        if to_remove:
+            for cconn in to_remove:
+                clients.pop(cconn, None)
+            self._start_stop()
 
     def add_client(self, web_request: WebRequest):
         cconn = web_request.get_client_connection()
@@ -2903,7 +3075,17 @@ class ScannerEndstopWrapper:
 
         ffi_main, ffi_lib = chelper.get_ffi()
         self._trdispatch = ffi_main.gc(ffi_lib.trdispatch_alloc(), ffi_lib.free)
+        self._trdispatch_start = ffi_lib.trdispatch_start
+        self._trdispatch_stop = ffi_lib.trdispatch_stop
         self._trsyncs = [MCU_trsync(self.scanner._mcu, self._trdispatch)]
+        # Only the threshold and trigger method change between homing moves
+        self._home_cmd_args = [
+            self._trsyncs[0].get_oid(),
+            MCU_trsync.REASON_ENDSTOP_HIT,
+            0,
+            0,
+            0,
+        ]
 
         printer = self.scanner.printer
         printer.register_event_handler("klippy:mcu_identify", self._handle_mcu_identify)
@@ -2956,18 +3138,17 @@ class ScannerEndstopWrapper:
         homing_state.set_homed_position([None, None, dist])
 
     def _handle_homing_move_begin(self, hmove):
-        if self.scanner.mcu_probe in hmove.get_mcu_endstops():
-            etrsync = self._trsyncs[0]
-            if self.scanner.trigger_method == TriggerMethod.TOUCH:
-                self.scanner.scanner_home_cmd.send(
-                    [
-                        etrsync.get_oid(),
-                        etrsync.REASON_ENDSTOP_HIT,
-                        0,
-                        self.scanner.detect_threshold_z,
-                        self.scanner.trigger_method,
-                    ]
-                )
+        if (
+            self.scanner.mcu_probe in hmove.get_mcu_endstops()
+            and self.scanner.trigger_method == TriggerMethod.TOUCH
+        ):
+            self._send_home_cmd()
+
+    def _send_home_cmd(self):
+        args = self._home_cmd_args
+        args[3] = self.scanner.detect_threshold_z
+        args[4] = self.scanner.trigger_method
+        self.scanner.scanner_home_cmd.send(args)
 
     def get_mcu(self):
         return self._mcu
@@ -3027,21 +3208,12 @@ class ScannerEndstopWrapper:
                     print_time, offset, self._trigger_completion, expire_timeout
                 )
         etrsync = self._trsyncs[0]
-        ffi_main, ffi_lib = chelper.get_ffi()
-        ffi_lib.trdispatch_start(self._trdispatch, etrsync.REASON_HOST_REQUEST)
+        self._trdispatch_start(self._trdispatch, etrsync.REASON_HOST_REQUEST)
 
         if self.scanner.trigger_method != TriggerMethod.SCAN:
             return self._trigger_completion
 
-        self.scanner.scanner_home_cmd.send(
-            [
-                etrsync.get_oid(),
-                etrsync.REASON_ENDSTOP_HIT,
-                0,
-                self.scanner.detect_threshold_z,
-                self.scanner.trigger_method,
-            ]
-        )
+        self._send_home_cmd()
         return self._trigger_completion
 
     def home_wait(self, home_end_time):
@@ -3051,8 +3223,7 @@ class ScannerEndstopWrapper:
             self._trigger_completion.complete(True)
         _ = self._trigger_completion.wait()
         self.scanner.scanner_stop_home.send()
-        ffi_main, ffi_lib = chelper.get_ffi()
-        ffi_lib.trdispatch_stop(self._trdispatch)
+        self._trdispatch_stop(self._trdispatch)
         res = [trsync.stop() for trsync in self._trsyncs]
         if any([r == etrsync.REASON_COMMS_TIMEOUT for r in res]):
             raise self.scanner.printer.command_error(
@@ -3077,6 +3248,23 @@ class ScannerEndstopWrapper:
         return self.scanner.trigger_distance
 
 
+# Initial capacity of the mesh sample buffer, it doubles whenever it fills up
+MESH_SAMPLE_BUFFER_SIZE = 4096
+
+
+@dataclass
+class MeshClusters:
+    # Non-empty clusters as cell ids (yi * res_x + xi) in ascending order,
+    # with the sample count of each one. The distances of all clusters are
+    # stored back to back in the same order.
+    cells: np.ndarray
+    counts: np.ndarray
+    dists: np.ndarray
+
+    def __len__(self):
+        return len(self.cells)
+
+
 @final
 class ScannerMeshHelper:
     @staticmethod
@@ -3098,7 +3286,6 @@ class ScannerMeshHelper:
         mesh_config: ConfigWrapper,
     ):
         self.scanner = scanner
-        self.scipy = None
         self.mesh_config = mesh_config
         self.bm = self.scanner.printer.load_object(mesh_config, "bed_mesh")
 
@@ -3140,7 +3327,7 @@ class ScannerMeshHelper:
 
         self.faulty_region_ = []
         self.faulty_regions = []
-        for i in list(range(1, 100, 1)):
+        for i in range(1, 100):
             start = mesh_config.getfloatlist(
                 "faulty_region_%d_min" % (i,), None, count=2
             )
@@ -3239,56 +3426,66 @@ class ScannerMeshHelper:
         begin_a, end_a = settings["range_aligned"]
         begin_p, end_p = settings["range_perpendicular"]
         swap_coord = settings["swap_coord"]
-        step = (end_p - begin_p) / (float(settings["count"] - 1))
-        points = []
+        count = settings["count"]
+        step = (end_p - begin_p) / (float(count - 1))
         corner_radius = min(step / 2, self.overscan)
-        for i in range(0, settings["count"]):
-            pos_p = begin_p + step * i
-            even = i % 2 == 0  # If even we are going "right", else "left'
-            pa = (begin_a, pos_p) if even else (end_a, pos_p)
-            pb = (end_a, pos_p) if even else (begin_a, pos_p)
-
-            l = (pa, pb)
-
-            if len(points) > 0 and corner_radius > 0:
-                # We need to insert an overscan corner. Basically we insert
-                # a rounded rectangle to smooth out the transition and retain
-                # as much speed as we can.
-                #
-                #  ---|---<
-                # /
-                # |
-                # \
-                #  ---|--->
-                #
-                # We just need to draw the two 90 degree arcs. They contain
-                # the endpoints of the lines connecting everything.
-                if even:
-                    center = begin_a - self.overscan + corner_radius
-                    points += arc_points(
-                        center, pos_p - step + corner_radius, corner_radius, -90, -90
-                    )
-                    points += arc_points(
-                        center, pos_p - corner_radius, corner_radius, -180, -90
-                    )
-                else:
-                    center = end_a + self.overscan - corner_radius
-                    points += arc_points(
-                        center, pos_p - step + corner_radius, corner_radius, -90, 90
-                    )
-                    points += arc_points(
-                        center, pos_p - corner_radius, corner_radius, 0, 90
-                    )
 
-            points.append(l[0])
-            points.append(l[1])
+        pos_p = begin_p + step * np.arange(count)
+        even = np.arange(count) % 2 == 0  # If even we are going "right", else "left'
+
+        # Each row is a straight line, alternating direction every row
+        lines = np.empty((count, 2, 2))
+        lines[:, 0, 0] = np.where(even, begin_a, end_a)
+        lines[:, 1, 0] = np.where(even, end_a, begin_a)
+        lines[:, :, 1] = pos_p[:, None]
+
+        if corner_radius <= 0 or count < 2:
+            points = lines.reshape(-1, 2)
+        else:
+            # We need to insert an overscan corner between rows. Basically
+            # we insert a rounded rectangle to smooth out the transition and
+            # retain as much speed as we can.
+            #
+            #  ---|---<
+            # /
+            # |
+            # \
+            #  ---|--->
+            #
+            # We just need to draw the two 90 degree arcs. They contain
+            # the endpoints of the lines connecting everything. Every arc
+            # has the same shape, so we compute them once around the origin
+            # and translate them onto each row.
+            arcs_even = (
+                arc_points(0, 0, corner_radius, -90, -90),
+                arc_points(0, 0, corner_radius, -180, -90),
+            )
+            arcs_odd = (
+                arc_points(0, 0, corner_radius, -90, 90),
+                arc_points(0, 0, corner_radius, 0, 90),
+            )
+            center = np.where(
+                even,
+                begin_a - self.overscan + corner_radius,
+                end_a + self.overscan - corner_radius,
+            )
+            centers_p = (pos_p - step + corner_radius, pos_p - corner_radius)
+            n_arc = len(arcs_even[0]) + len(arcs_even[1])
+            rows = np.empty((count, n_arc + 2, 2))
+            offset = 0
+            for arc_even, arc_odd, center_p in zip(arcs_even, arcs_odd, centers_p):
+                arc = np.where(even[:, None, None], arc_even, arc_odd)
+                end = offset + len(arc_even)
+                rows[:, offset:end, 0] = center[:, None] + arc[:, :, 0]
+                rows[:, offset:end, 1] = center_p[:, None] + arc[:, :, 1]
+                offset = end
+            rows[:, n_arc:] = lines
+            points = np.concatenate((lines[0], rows[1:].reshape(-1, 2)))
 
         if swap_coord:
-            for i in range(len(points)):
-                (x, y) = points[i]
-                points[i] = (y, x)
+            points = points[:, ::-1]
 
-        return points
+        return points.tolist()
 
     def calibrate(self, gcmd: GCodeCommand):
         self.min_x, self.min_y = coord_fallback(
@@ -3444,11 +3641,17 @@ class ScannerMeshHelper:
         self.profile_name = None
 
     def _fly_path(self, path, speed, runs):
-        # Run through the path
+        # Run through the path. manual_move copies the coordinates it is
+        # given, so a single list is reused for every move.
+        forward = tuple(path)
+        backward = forward[::-1]
+        manual_move = self.toolhead.manual_move
+        coord = [0.0, 0.0, None]
         for i in range(runs):
-            p = path if i % 2 == 0 else reversed(path)
-            for x, y in p:
-                self.toolhead.manual_move([x, y, None], speed)
+            for x, y in forward if i % 2 == 0 else backward:
+                coord[0] = x
+                coord[1] = y
+                manual_move(coord, speed)
         self.toolhead.dwell(0.251)
         self.toolhead.wait_moves()
 
@@ -3460,13 +3663,23 @@ class ScannerMeshHelper:
         self.zero_ref_val = dist
 
     def _is_valid_position(self, x, y):
-        return self.min_x <= x <= self.max_x and self.min_y <= y <= self.min_y
+        return self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y
+
+    def _valid_mask(self, xs, ys):
+        return (
+            (xs >= self.min_x)
+            & (xs <= self.max_x)
+            & (ys >= self.min_y)
+            & (ys <= self.max_y)
+        )
 
     def _is_faulty_coordinate(self, x, y, add_offsets=False):
         if add_offsets:
             xo, yo = self.scanner.offset["x"], self.scanner.offset["y"]
             x += xo
             y += yo
+        # Called per point with scalars, where a short loop over the regions
+        # beats building numpy arrays
         for r in self.faulty_regions:
             if r.is_point_within(x, y):
                 return True
@@ -3478,98 +3691,106 @@ class ScannerMeshHelper:
         if not (self.zero_ref_mode and self.zero_ref_mode[0] == "pos"):
             zcs = 0
 
-        min_x, min_y = self.min_x, self.min_y
-        xo, yo = self.scanner.offset["x"], self.scanner.offset["y"]
-
-        clusters = {}
-        total_samples = [0]
-        invalid_samples = [0]
+        # Samples are only buffered while streaming and binned afterwards,
+        # rows hold (dist, x, y) with a missing distance stored as inf.
+        buffer = np.empty((MESH_SAMPLE_BUFFER_SIZE, 3))
+        count = 0
 
         def cb(sample):
-            total_samples[0] += 1
+            nonlocal buffer, count
+            if count == len(buffer):
+                buffer = np.concatenate((buffer, np.empty_like(buffer)))
             d = sample["dist"]
-            (x, y, z) = sample["pos"]
-            x += xo
-            y += yo
-
-            if d is None or math.isinf(d):
-                if self._is_valid_position(x, y):
-                    invalid_samples[0] += 1
-                return
-
-            # Calculate coordinate of the cluster we are in
-            xi = int(round((x - min_x) / self.step_x))
-            yi = int(round((y - min_y) / self.step_y))
-            if xi < 0 or self.res_x <= xi or yi < 0 or self.res_y <= yi:
-                return
-
-            # If there's a cluster size limit, apply it here
-            if cs > 0:
-                xf = xi * self.step_x + min_x
-                yf = yi * self.step_y + min_y
-                dx = x - xf
-                dy = y - yf
-                dist = math.sqrt(dx * dx + dy * dy)
-                if dist > cs:
-                    return
-
-            # If we are looking for a zero reference, check if we
-            # are close enough and if so, add to the bin.
-            if zcs > 0:
-                # TODO: These can be None?
-                dx = x - self.zero_ref_mode[1][0]  # pyright: ignore[reportOptionalSubscript,reportIndexIssue]
-                dy = y - self.zero_ref_mode[1][1]  # pyright: ignore[reportOptionalSubscript,reportIndexIssue]
-                dist = math.sqrt(dx * dx + dy * dy)
-                if dist <= zcs:
-                    self.zero_ref_bin.append(d)
-
-            k = (xi, yi)
-
-            if k not in clusters:
-                clusters[k] = []
-            clusters[k].append(d)
+            (x, y, _z) = sample["pos"]
+            buffer[count] = (math.inf if d is None else d, x, y)
+            count += 1
 
         with self.scanner.streaming_session(cb):
             self._fly_path(path, speed, runs)
 
-        gcmd.respond_info(
-            "Sampled %d total points over %d runs" % (total_samples[0], runs)
-        )
-        if invalid_samples[0]:
-            gcmd.respond_info(
-                "!! Encountered %d invalid samples!" % (invalid_samples[0],)
-            )
+        xo, yo = self.scanner.offset["x"], self.scanner.offset["y"]
+        dists, xs, ys = buffer[:count].T
+        clusters, invalid_samples = self._bin_samples(dists, xs + xo, ys + yo, cs, zcs)
+
+        gcmd.respond_info("Sampled %d total points over %d runs" % (count, runs))
+        if invalid_samples:
+            gcmd.respond_info("!! Encountered %d invalid samples!" % (invalid_samples,))
         gcmd.respond_info("Samples binned in %d clusters" % (len(clusters),))
 
         return clusters
 
+    def _bin_samples(self, dists, xs, ys, cs, zcs):
+        min_x, min_y = self.min_x, self.min_y
+
+        invalid = np.isinf(dists)
+        invalid_samples = int(
+            np.count_nonzero(self._valid_mask(xs[invalid], ys[invalid]))
+        )
+
+        # Calculate coordinate of the cluster each sample is in. Cluster i
+        # spans the half-step either side of its center, samples outside
+        # the first and last edges end up at -1 and res.
+        x_edges = min_x + (np.arange(self.res_x + 1) - 0.5) * self.step_x
+        y_edges = min_y + (np.arange(self.res_y + 1) - 0.5) * self.step_y
+        xi = np.searchsorted(x_edges, xs, side="right") - 1
+        yi = np.searchsorted(y_edges, ys, side="right") - 1
+        keep = ~invalid & (xi >= 0) & (xi < self.res_x) & (yi >= 0) & (yi < self.res_y)
+
+        # If there's a cluster size limit, apply it here
+        if cs > 0:
+            dx = xs - (xi * self.step_x + min_x)
+            dy = ys - (yi * self.step_y + min_y)
+            keep &= dx * dx + dy * dy <= cs * cs
+
+        dists, xs, ys = dists[keep], xs[keep], ys[keep]
+        xi, yi = xi[keep], yi[keep]
+
+        # If we are looking for a zero reference, add every sample close
+        # enough to it to the bin.
+        if zcs > 0:
+            # TODO: These can be None?
+            zrx = self.zero_ref_mode[1][0]  # pyright: ignore[reportOptionalSubscript,reportIndexIssue]
+            zry = self.zero_ref_mode[1][1]  # pyright: ignore[reportOptionalSubscript,reportIndexIssue]
+            dx = xs - zrx
+            dy = ys - zry
+            self.zero_ref_bin.extend(dists[dx * dx + dy * dy <= zcs * zcs].tolist())
+
+        # Group the samples by cluster, keeping them in the order they came in
+        cells = yi * self.res_x + xi
+        order = np.argsort(cells, kind="stable")
+        cells, counts = np.unique(cells[order], return_counts=True)
+        return MeshClusters(cells, counts, dists[order]), invalid_samples
+
     def _process_clusters(self, raw_clusters, gcmd: GCodeCommand):
-        parent_conn, child_conn = multiprocessing.Pipe()
         dump_file = gcmd.get("FILENAME", None)
+        if not self.faulty_regions and not dump_file:
+            # Without faulty regions or a dump this is only a handful of
+            # medians, not worth handing off to another thread.
+            is_inner_err, inner_result = self._do_process_clusters(raw_clusters, None)
+            if is_inner_err:
+                raise gcmd.error(inner_result)
+            return inner_result
+
+        results = queue.Queue()
 
         def do():
             try:
-                child_conn.send(
-                    (
-                        False,
-                        self._do_process_clusters(raw_clusters, dump_file),
-                    )
-                )
+                results.put((False, self._do_process_clusters(raw_clusters, dump_file)))
             except Exception:
-                child_conn.send((True, traceback.format_exc()))
-            finally:
-                child_conn.close()
-
-        child = multiprocessing.Process(target=do)
-        child.daemon = True
-        child.start()
+                results.put((True, traceback.format_exc()))
+
+        # The processing is mostly numpy work, so a thread keeps the
+        # reactor responsive without having to pickle the clusters over to
+        # a child process.
+        worker = threading.Thread(target=do)
+        worker.daemon = True
+        worker.start()
         reactor = self.scanner.reactor
         eventtime = reactor.monotonic()
-        while child.is_alive():
+        while worker.is_alive():
             eventtime = reactor.pause(eventtime + 0.1)
-        is_err, result = parent_conn.recv()
-        child.join()
-        parent_conn.close()
+        worker.join()
+        is_err, result = results.get()
         if is_err:
             raise Exception("Error processing mesh: %s" % (result,))
         else:
@@ -3581,25 +3802,36 @@ class ScannerMeshHelper:
 
     def _do_process_clusters(self, raw_clusters, dump_file):
         if dump_file:
-            with open(dump_file, "w") as f:
-                f.write("x,y,xp,xy,dist\n")
-                for yi in range(self.res_y):
-                    for xi in range(self.res_x):
-                        cluster = raw_clusters.get((xi, yi), [])
-                        xp = xi * self.step_x + self.min_x
-                        yp = yi * self.step_y + self.min_y
-                        for dist in cluster:
-                            f.write("%d,%d,%f,%f,%f\n" % (xi, yi, xp, yp, dist))
+            xi = np.repeat(raw_clusters.cells % self.res_x, raw_clusters.counts)
+            yi = np.repeat(raw_clusters.cells // self.res_x, raw_clusters.counts)
+            np.savetxt(
+                dump_file,
+                np.column_stack(
+                    (
+                        xi,
+                        yi,
+                        xi * self.step_x + self.min_x,
+                        yi * self.step_y + self.min_y,
+                        raw_clusters.dists,
+                    )
+                ),
+                fmt="%d,%d,%f,%f,%f",
+                header="x,y,xp,xy,dist",
+                comments="",
+            )
 
         mask = self._generate_fault_mask()
-        matrix, faulty_regions = self._generate_matrix(raw_clusters, mask)
-        if len(faulty_regions) > 0:
-            (error, interpolator_or_msg) = self._load_interpolator()
-            if error:
-                return (True, interpolator_or_msg)
-            matrix = self._interpolate_faulty(
-                matrix, faulty_regions, interpolator_or_msg
-            )
+        matrix, faulty = self._generate_matrix(raw_clusters, mask)
+        if faulty is not None and faulty.any():
+            try:
+                matrix = self._interpolate_faulty(matrix, faulty)
+            except ImportError:
+                msg = (
+                    "Could not load `scipy`. To install it, simply re-run "
+                    "the Scanner `install.sh` script. This module is required "
+                    "when using faulty regions when bed meshing."
+                )
+                return (True, msg)
         err = self._check_matrix(matrix)
         if err is not None:
             return (True, err)
@@ -3609,77 +3841,56 @@ class ScannerMeshHelper:
         if len(self.faulty_regions) == 0:
             return None
         mask = np.full((self.res_y, self.res_x), True)
-        for r in self.faulty_regions:
-            r_xmin = max(0, int(math.ceil((r.x_min - self.min_x) / self.step_x)))
-            r_ymin = max(0, int(math.ceil((r.y_min - self.min_y) / self.step_y)))
-            r_xmax = min(
-                self.res_x - 1, int(math.floor((r.x_max - self.min_x) / self.step_x))
-            )
-            r_ymax = min(
-                self.res_y - 1, int(math.floor((r.y_max - self.min_y) / self.step_y))
-            )
-            for y in range(r_ymin, r_ymax + 1):
-                for x in range(r_xmin, r_xmax + 1):
-                    mask[(y, x)] = False
+        x_min, y_min, x_max, y_max = self.faulty_region_
+        x_lo = np.maximum(0, np.ceil((x_min - self.min_x) / self.step_x)).astype(int)
+        y_lo = np.maximum(0, np.ceil((y_min - self.min_y) / self.step_y)).astype(int)
+        x_hi = np.minimum(
+            self.res_x - 1, np.floor((x_max - self.min_x) / self.step_x)
+        ).astype(int)
+        y_hi = np.minimum(
+            self.res_y - 1, np.floor((y_max - self.min_y) / self.step_y)
+        ).astype(int)
+        for r_xmin, r_ymin, r_xmax, r_ymax in zip(
+            x_lo.tolist(), y_lo.tolist(), x_hi.tolist(), y_hi.tolist()
+        ):
+            if r_xmin <= r_xmax and r_ymin <= r_ymax:
+                mask[r_ymin : r_ymax + 1, r_xmin : r_xmax + 1] = False
         return mask
 
     def _generate_matrix(self, raw_clusters, mask):
-        faulty_indexes = []
-        matrix = np.empty((self.res_y, self.res_x))
-        for (x, y), values in raw_clusters.items():
-            if mask is None or mask[(y, x)]:
-                matrix[(y, x)] = self.scanner.trigger_distance - median(values)
-            else:
-                matrix[(y, x)] = np.nan
-                faulty_indexes.append((y, x))
-        return matrix, faulty_indexes
-
-    def _load_interpolator(self):
-        if not self.scipy:
-            try:
-                self.scipy = importlib.import_module("scipy")
-            except ImportError:
-                msg = (
-                    "Could not load `scipy`. To install it, simply re-run "
-                    "the Scanner `install.sh` script. This module is required "
-                    "when using faulty regions when bed meshing."
-                )
-                return (True, msg)
-        if hasattr(self.scipy.interpolate, "RBFInterpolator"):
-            # TODO: We should not reference self in a callback and make assumptions
-            def rbf_interp(points, values, faulty):
-                return self.scipy.interpolate.RBFInterpolator(points, values, 64)(  # pyright: ignore[reportOptionalMemberAccess]
-                    faulty
-                )
-
-            return (False, rbf_interp)
-        else:
-
-            def linear_interp(points, values, faulty):
-                return self.scipy.interpolate.griddata(  # pyright: ignore[reportOptionalMemberAccess]
-                    points, values, faulty, method="linear"
-                )
-
-            return (False, linear_interp)
-
-    def _interpolate_faulty(self, matrix, faulty_indexes, interpolator):
-        ys, xs = np.mgrid[0 : matrix.shape[0], 0 : matrix.shape[1]]
-        points = np.array([ys.flatten(), xs.flatten()]).T
-        values = matrix.reshape(-1)
-        good = ~np.isnan(values)
-        fixed = interpolator(points[good], values[good], faulty_indexes)
-        matrix[tuple(np.array(faulty_indexes).T)] = fixed
-        return matrix
+        matrix = np.full((self.res_y, self.res_x), np.nan)
+        if len(raw_clusters):
+            # Take the medians one cluster size at a time, so a single
+            # oversized cluster doesn't pad every other one out to its length
+            counts = raw_clusters.counts
+            starts = np.cumsum(counts) - counts
+            medians = np.empty(len(counts))
+            for size in np.unique(counts).tolist():
+                sel = counts == size
+                rows = raw_clusters.dists[starts[sel, None] + np.arange(size)]
+                medians[sel] = np.median(rows, axis=1)
+            xi = raw_clusters.cells % self.res_x
+            yi = raw_clusters.cells // self.res_x
+            matrix[yi, xi] = self.scanner.trigger_distance - medians
+        if mask is None:
+            return matrix, None
+        faulty = ~mask
+        matrix[faulty] = np.nan
+        return matrix, faulty
+
+    def _interpolate_faulty(self, matrix, faulty):
+        return inpaint_harmonic(matrix, faulty)
 
     def _check_matrix(self, matrix):
-        empty_clusters = []
-        for yi in range(self.res_y):
-            for xi in range(self.res_x):
-                if np.isnan(matrix[(yi, xi)]):
-                    xc = xi * self.step_x + self.min_x
-                    yc = yi * self.step_y + self.min_y
-                    empty_clusters.append("  (%.3f,%.3f)[%d,%d]" % (xc, yc, xi, yi))
-        if empty_clusters:
+        empty = np.argwhere(np.isnan(matrix))
+        if empty.size:
+            yi, xi = empty.T
+            xc = xi * self.step_x + self.min_x
+            yc = yi * self.step_y + self.min_y
+            empty_clusters = [
+                "  (%.3f,%.3f)[%d,%d]" % cluster
+                for cluster in zip(xc.tolist(), yc.tolist(), xi.tolist(), yi.tolist())
+            ]
             err = (
                 "Empty clusters found\n"
                 "Try increasing mesh cluster_size or slowing down.\n"
@@ -3745,6 +3956,79 @@ class Region:
         )
 
 
+def inpaint_harmonic(matrix, fill):
+    # Replace the cells selected by `fill` with the solution of the discrete
+    # Laplace equation, using the surrounding measured cells as the boundary.
+    # Every filled cell ends up as the average of its grid neighbours, which
+    # gives a smooth surface across the hole. NaN cells outside `fill` and
+    # cells outside the grid do not contribute. The overall tilt of the bed
+    # is fitted as a plane and taken out first, so holes at the edge of the
+    # mesh still follow it.
+    from scipy import sparse
+    from scipy.sparse import csgraph as sparse_csgraph
+    from scipy.sparse import linalg as sparse_linalg
+
+    ys, xs = np.nonzero(fill)
+    n = len(ys)
+    if n == 0:
+        return matrix
+    height, width = matrix.shape
+    index = np.full(matrix.shape, -1)
+    index[ys, xs] = np.arange(n)
+    known = ~fill & ~np.isnan(matrix)
+    grid_y, grid_x = np.indices(matrix.shape)
+    plane = np.zeros(matrix.shape)
+    if np.count_nonzero(known) >= 3:
+        design = np.stack(
+            (grid_x[known], grid_y[known], np.ones(np.count_nonzero(known))), axis=1
+        )
+        coef = np.linalg.lstsq(design, matrix[known], rcond=None)[0]
+        plane = coef[0] * grid_x + coef[1] * grid_y + coef[2]
+    residual = matrix - plane
+    # The system has at most five entries per row, so it is built and solved
+    # as a sparse matrix to keep large holes cheap in time and memory.
+    rows = np.arange(n)
+    diag = np.zeros(n)
+    anchored = np.zeros(n, dtype=bool)
+    a_rows, a_cols = [], []
+    b = np.zeros(n)
+    for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        ny, nx = ys + dy, xs + dx
+        inside = (ny >= 0) & (ny < height) & (nx >= 0) & (nx < width)
+        r, ny, nx = rows[inside], ny[inside], nx[inside]
+        unknown = fill[ny, nx]
+        usable = unknown | known[ny, nx]
+        r, ny, nx, unknown = r[usable], ny[usable], nx[usable], unknown[usable]
+        diag[r] += 1
+        a_rows.append(r[unknown])
+        a_cols.append(index[ny[unknown], nx[unknown]])
+        b[r[~unknown]] += residual[ny[~unknown], nx[~unknown]]
+        anchored[r[~unknown]] = True
+    off_rows = np.concatenate(a_rows)
+    off_cols = np.concatenate(a_cols)
+    # A hole without any measured neighbour has no solution. Pin its cells
+    # so the rest of the system stays solvable, and leave them empty
+    # afterwards so they get reported.
+    _, labels = sparse_csgraph.connected_components(
+        sparse.csr_matrix((np.ones(len(off_rows)), (off_rows, off_cols)), shape=(n, n)),
+        directed=False,
+    )
+    floating = ~np.isin(labels, labels[anchored])
+    diag[floating] += 1
+    a = sparse.csc_matrix(
+        (
+            np.concatenate((diag, -np.ones(len(off_rows)))),
+            (np.concatenate((rows, off_rows)), np.concatenate((rows, off_cols))),
+        ),
+        shape=(n, n),
+    )
+    matrix = matrix.copy()
+    solution = sparse_linalg.spsolve(a, b)
+    solution[floating] = np.nan
+    matrix[ys, xs] = solution + plane[ys, xs]
+    return matrix
+
+
 def arc_points(cx, cy, r, start_angle, span):
     # Angle delta is determined by a max deviation(md) from 0.1mm:
     #   r * versin(d_a) < md
@@ -3760,14 +4044,8 @@ def arc_points(cx, cy, r, start_angle, span):
     cnt = int(math.ceil(abs(span) / d_a))
     d_a = span / float(cnt)
 
-    points = []
-    for i in range(cnt + 1):
-        ang = start_angle + d_a * float(i)
-        x = cx + math.cos(ang) * r
-        y = cy + math.sin(ang) * r
-        points.append((x, y))
-
-    return points
+    angles = start_angle + d_a * np.arange(cnt + 1, dtype=float)
+    return np.stack((cx + np.cos(angles) * r, cy + np.sin(angles) * r), axis=1)
 
 
 def convert_float(data) -> float:
@@ -3794,9 +4072,42 @@ def coord_fallback(
 
 
 def median(samples):
+    # Sorting a short list in Python beats the cost of building an array
+    if len(samples) < 64:
+        return float(statistics.median(samples))
     return float(np.median(samples))
 
 
+def summarize_samples(samples, median_tolerance=0.05) -> ThresholdResults:
+    zs = np.asarray(samples, dtype=float)
+    count = len(zs)
+    # A single partition gives us the median without a full sort
+    mid = count // 2
+    if count % 2 == 1:
+        median_ = float(np.partition(zs, mid)[mid])
+    else:
+        part = np.partition(zs, [mid - 1, mid])
+        median_ = float((part[mid - 1] + part[mid]) / 2)
+    max_value = float(zs.max())
+    min_value = float(zs.min())
+    avg_value = float(zs.mean())
+    deviation = zs - median_
+    in_range = int(np.count_nonzero(np.abs(deviation) < median_tolerance))
+    early = int(np.count_nonzero(deviation >= median_tolerance))
+    return ThresholdResults(
+        max_value=max_value,
+        min_value=min_value,
+        range_value=max_value - min_value,
+        avg_value=avg_value,
+        median=median_,
+        sigma=float(np.sqrt(np.mean((zs - avg_value) ** 2))),
+        in_range=in_range,
+        early=early,
+        late=count - in_range - early,
+        nb_samples=count,
+    )
+
+
 def opt_min(a, b):
     if a is None:
         return b
@@ -2,33 +2,37 @@
 
 import os
 import re
-import subprocess
+import sys
 import argparse
-import shutil
-import tempfile
 import fnmatch
-import platform
+import functools
 import time
 
 from enum import Enum
-from time import sleep
 from typing import (
     Optional,
     TypedDict,
     Callable,
-    NamedTuple,
     Dict,
+    FrozenSet,
     List,
     Union,
     Tuple,
-    Set,
+    Iterator,
 )
 
-HOME_PATH = os.path.expanduser("~")
-CONFIG_DIR: str = os.path.expanduser("~/printer_data/config")
-KLIPPY_LOG: str = os.path.expanduser("~/printer_data/logs/klippy.log")
-KLIPPER_DIR: str = os.path.expanduser("~/klipper")
-KATAPULT_DIR: str = os.path.expanduser("~/katapult")
+_HOME: str = os.path.expanduser("~")
+HOME_PATH = _HOME
+CONFIG_DIR: str = f"{_HOME}/printer_data/config"
+KLIPPY_LOG: str = f"{_HOME}/printer_data/logs/klippy.log"
+KLIPPER_DIR: str = f"{_HOME}/klipper"
+KATAPULT_DIR: str = f"{_HOME}/katapult"
+SERIAL_BY_ID_DIR: str = "/dev/serial/by-id/"
+SYSFS_USB_DIR: str = "/sys/bus/usb/devices"
+CANBUS_UUID_KEY: str = "canbus_uuid ="
+MCU_SCANNER_SECTION: str = "[mcu scanner]"
+SCANNER_SECTION: str = "[scanner]"
+KATAPULT_ENUMERATE_TIMEOUT: float = 8.0  # Seconds to wait for the bootloader
 
 FLASHER_VERSION: str = "0.0.1"
 
@@ -36,8 +40,25 @@ PAGE_WIDTH: int = 89  # Default global width
 
 is_advanced: bool = False
 
+_CAN_RE = re.compile(r"^[a-f0-9]{12}$")
+_USB_RE = re.compile(r".*Cartographer.*")
+_DFU_RE = re.compile(r"^[a-f0-9]{4}:[a-f0-9]{4}$")
+_DEVICE_RE = {"CAN": _CAN_RE, "USB": _USB_RE}
+_BITRATE_RE = re.compile(r"bitrate\s(\d+)")
+_UUID_RE = re.compile(r"Detected UUID:\s*([0-9a-fA-F]+)")
+_SEMVER_RE = re.compile(r"^(\d+)\.(\d+)\.(\d+)$")
+_LSUSB_DFU_RE = re.compile(
+    rb"^Bus \S+ Device \S+: ID (\S+) [^\n]*DFU Mode", re.MULTILINE
+)
+# Harmless dfu-util warnings that shouldn't fail a flash
+_DFU_IGNORED_WARNINGS_RE = re.compile(
+    r"Invalid DFU suffix signature|can't detach|A valid DFU suffix"
+)
+# dfu-util redraws its progress bar with bare carriage returns
+_LINE_END_RE = re.compile(rb"\r\n|[\r\n]")
+
 
-class Color(Enum):
+class Color(str, Enum):
     RESET = "\033[0m"
     RED = "\033[91m"
     GREEN = "\033[92m"
@@ -46,12 +67,18 @@ class Color(Enum):
     CYAN = "\033[96m"
 
 
+_RESET: str = Color.RESET.value
+
+
 class FlashMethod(str, Enum):
     CAN = "CAN"
     USB = "USB"
     DFU = "DFU"
 
 
+_FLASH_METHODS = {m.name: m for m in FlashMethod}
+
+
 # Define a custom namespace class
 class FirmwareNamespace(argparse.Namespace):
     branch: str = "master"
@@ -82,6 +109,12 @@ class VersionParser:
         :return: A tuple (major, minor, patch) with integer components.
         :raises ValueError: If the version string is not properly formatted.
         """
+        # Fast path for plain "major.minor.patch" strings
+        match = _SEMVER_RE.match(version)
+        if match:
+            major, minor, patch = match.groups()
+            return int(major), int(minor), int(patch)
+
         # Split the version string into parts
         parts: list[str] = version.split(".")
 
@@ -96,14 +129,11 @@ class VersionParser:
         return major, minor, patch
 
 
-class FirmwareFile(NamedTuple):
-    subdirectory: str
-    filename: str
-
-
 class Utils:
     @staticmethod
     def make_terminal_bigger(width: int = 110, height: int = 40):
+        import platform
+
         system = platform.system()
         if system == "Windows":
             _ = os.system(f"mode con: cols={width} lines={height}")
@@ -125,41 +155,19 @@ class Utils:
     @staticmethod
     def header():
         Utils.clear_console()
-        # Define the logo or ASCII art
-        logo = """ 
-        ____                  _                                            _               
-/ ___|   __ _   _ __  | |_    ___     __ _   _ __    __ _   _ __   | |__     ___   _ __ 
-| |      / _  | | '__| | __|  / _ \\   / _  | | '__|  / _  | | '_ \\  | '_ \\   / _ \\ | '__|
-| |___  | (_| | | |    | |_  | (_) | | (_| | | |    | (_| | | |_) | | | | | |  __/ | |   
-\\____|  \\__,_| |_|     \\__|  \\___/   \\__, | |_|     \\__,_| | .__/  |_| |_|  \\___| |_|   
-            |___/                 |_|                          
-        """
-        # Calculate the width dynamically based on the longest line
-        lines = logo.strip().split("\n")
-        max_width = max(len(line) for line in lines)
-        border = "=" * max_width
-
-        # Print the header with borders
-        print(border)
-        for line in lines:
-            print(Utils.colored_text(line.center(max_width), Color.GREEN))
-        print(border)
-        title = "CARTOGRAPHER FIRMWARE FLASHER"
-        version = f" v{FLASHER_VERSION}"
-        combined_title = Utils.colored_text(title, Color.CYAN) + Utils.colored_text(
-            version, Color.RED
-        )
-        print(combined_title.center(105))
+        # Print the prebuilt logo and title between borders
+        _ = sys.stdout.write(_HEADER_BODY)
 
         # Display modes, centered
         Utils.display_modes(args)
 
         # Print the bottom border
-        print("=" * max_width)
+        print(_HEADER_BORDER)
 
     @staticmethod
+    @functools.lru_cache(maxsize=256)
     def colored_text(text: str, color: Color) -> str:
-        return f"{color.value}{text}{Color.RESET.value}"
+        return f"{color.value}{text}{_RESET}"
 
     @staticmethod
     def error_msg(message: str) -> None:
@@ -171,6 +179,55 @@ class Utils:
         print(Utils.colored_text("Success:", Color.GREEN), message)
         _ = input(Utils.colored_text("\nPress Enter to continue...", Color.YELLOW))
 
+    @staticmethod
+    def scan_by_id(
+        substrings: Tuple[str, ...] = ("cartographer", "katapult"),
+    ) -> List[str]:
+        """List by-id serial devices whose name contains any of the substrings."""
+        try:
+            with os.scandir(SERIAL_BY_ID_DIR) as entries:
+                return [
+                    entry.name
+                    for entry in entries
+                    if any(sub in entry.name.lower() for sub in substrings)
+                ]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def run_streaming(command: List[str]) -> Tuple[int, str]:
+        """
+        Run a command, printing its stdout as it arrives while collecting
+        stderr, and return the exit code along with the captured stderr.
+        """
+        import selectors
+        import subprocess
+
+        stderr = bytearray()
+        pending = b""
+        with subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0
+        ) as process, selectors.DefaultSelector() as selector:
+            # Wait on both pipes at once so neither can fill up and stall the child
+            for pipe in (process.stdout, process.stderr):
+                if pipe is not None:
+                    _ = selector.register(pipe, selectors.EVENT_READ)
+            while selector.get_map():
+                for key, _ in selector.select():
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        _ = selector.unregister(key.fileobj)
+                    elif key.fileobj is process.stderr:
+                        stderr += chunk
+                    else:
+                        *lines, pending = _LINE_END_RE.split(pending + chunk)
+                        for line in lines:
+                            print(line.decode(errors="replace").strip())
+            if pending:
+                print(pending.decode(errors="replace").strip())
+            returncode = process.wait()
+        return returncode, stderr.decode(errors="replace").strip()
+
     @staticmethod
     def page(title: str, width: int = PAGE_WIDTH) -> None:
         if len(title) > width:
@@ -182,26 +239,31 @@ class Utils:
 
     @staticmethod
     def display_modes(args: FirmwareNamespace) -> None:
-        # Map conditions to mode strings
-        mode_conditions = [
-            (args.flash, lambda: f"{(args.flash or '').upper()} MODE"),
-            (args.kseries, lambda: "K Series"),
-            (args.high_temp, lambda: "HIGH TEMP"),
-            (args.debug, lambda: "DEBUGGING"),
-            (args.branch, lambda: f"BRANCH: {(args.branch or '').upper()}"),
-            (args.type, lambda: "FLASH KATAPULT"),
-            (args.all, lambda: "ALL FIRMWARE"),
-            (is_advanced, lambda: "ADVANCED"),
-        ]
-
         # Build modes list based on conditions
-        modes = [
-            generate_mode() for condition, generate_mode in mode_conditions if condition
-        ]
+        modes: list[str] = []
+        if args.flash:
+            modes.append(f"{args.flash.upper()} MODE")
+        if args.kseries:
+            modes.append("K Series")
+        if args.high_temp:
+            modes.append("HIGH TEMP")
+        if args.debug:
+            modes.append("DEBUGGING")
+        if args.branch:
+            modes.append(f"BRANCH: {args.branch.upper()}")
+        if args.type:
+            modes.append("FLASH KATAPULT")
+        if args.all:
+            modes.append("ALL FIRMWARE")
+        if is_advanced:
+            modes.append("ADVANCED")
+
+        # Nothing to show without any active modes
+        if not modes:
+            return
 
         # Combine modes into a single string
-        combined_modes = " | ".join(modes)
-        Utils.show_mode(combined_modes)
+        Utils.show_mode(" | ".join(modes))
 
     @staticmethod
     def show_mode(mode: str):
@@ -210,6 +272,40 @@ class Utils:
         print(Utils.colored_text(mode, Color.RED))
 
 
+# Define the logo or ASCII art
+_LOGO = """ 
+        ____                  _                                            _               
+/ ___|   __ _   _ __  | |_    ___     __ _   _ __    __ _   _ __   | |__     ___   _ __ 
+| |      / _  | | '__| | __|  / _ \\   / _  | | '__|  / _  | | '_ \\  | '_ \\   / _ \\ | '__|
+| |___  | (_| | | |    | |_  | (_) | | (_| | | |    | (_| | | |_) | | | | | |  __/ | |   
+\\____|  \\__,_| |_|     \\__|  \\___/   \\__, | |_|     \\__,_| | .__/  |_| |_|  \\___| |_|   
+            |___/                 |_|                          
+        """
+# The header never changes between redraws, so build it once
+_HEADER_LINES = _LOGO.strip().split("\n")
+_HEADER_WIDTH = max(len(line) for line in _HEADER_LINES)
+_HEADER_BORDER = "=" * _HEADER_WIDTH
+_HEADER_TITLE = Utils.colored_text(
+    "CARTOGRAPHER FIRMWARE FLASHER", Color.CYAN
+) + Utils.colored_text(f" v{FLASHER_VERSION}", Color.RED)
+_CENTERED_LOGO = [line.center(_HEADER_WIDTH) for line in _HEADER_LINES]
+_COLORED_LOGO = [Utils.colored_text(line, Color.GREEN) for line in _CENTERED_LOGO]
+_HEADER_BODY = "\n".join(
+    [
+        _HEADER_BORDER,
+        *_COLORED_LOGO,
+        _HEADER_BORDER,
+        _HEADER_TITLE.center(105),
+        "",
+    ]
+)
+
+# Static labels shared by several menus
+_LBL_SELECTED = Utils.colored_text("(selected)", Color.GREEN)
+_LBL_BACK_TO_MAIN = Utils.colored_text("Back to main menu", Color.CYAN)
+_LBL_BACK_TO_MAIN_MENU = Utils.colored_text("Back to Main Menu", Color.CYAN)
+
+
 class Menu:
     title: str
     menu_items: Dict[int, Union["Menu.Item", "Menu.Separator"]]
@@ -233,39 +329,50 @@ class Menu:
         self.title = title
         self.menu_items = menu_items
 
+    def render(self) -> str:
+        """Build the full menu frame as a single string."""
+        width = max(
+            PAGE_WIDTH, len(self.title) + 4
+        )  # Ensure width accommodates long titles
+        border = "=" * width
+        lines = [
+            border,
+            Utils.colored_text(self.title.center(width).upper(), Color.MAGENTA),
+            border,
+        ]
+
+        # Add menu items and separators
+        indent = " "  # Adjust the number of spaces for indentation
+        for key, menu_item in self.menu_items.items():
+            if isinstance(menu_item, self.Separator):
+                lines.append(
+                    "-" * width + (f" {menu_item.text}" if menu_item.text else "")
+                )
+            else:
+                description = (
+                    Utils.colored_text(menu_item.description, Color.RED)
+                    if key == 0
+                    else menu_item.description
+                )
+                lines.append(f"{indent}{key}. {description}")
+        lines.append(border)
+        lines.append("")
+        return "\n".join(lines)
+
     def display(self) -> None:
+        # The items don't change while the menu is shown, so the frame is
+        # built once and redrawn as-is after an invalid choice
+        frame = self.render()
         while True:
-            # Determine and print the menu header
-            width = max(
-                PAGE_WIDTH, len(self.title) + 4
-            )  # Ensure width accommodates long titles
-            border = "=" * width
-            print(border)
-            print(Utils.colored_text(self.title.center(width).upper(), Color.MAGENTA))
-            print(border)
-
-            # Print menu items and separators
-            indent = " "  # Adjust the number of spaces for indentation
-            for key, menu_item in self.menu_items.items():
-                if isinstance(menu_item, self.Separator):
-                    print(
-                        "-" * width + (f" {menu_item.text}" if menu_item.text else "")
-                    )
-                else:
-                    item_color = Color.RED if key == 0 else None
-                    print(
-                        f"{indent}{key}.",
-                        Utils.colored_text(menu_item.description, item_color)
-                        if item_color
-                        else menu_item.description,
-                    )
-            print(border)
+            # Draw the whole menu in a single write
+            _ = sys.stdout.write(frame)
+            sys.stdout.flush()
 
             # Get user input
             choice = self.get()
             if choice == 0:
                 print(Utils.colored_text("Exiting...", Color.CYAN))
-                exit()
+                sys.exit()
 
             # Validate and handle the choice
             if self.is_valid(choice):
@@ -306,6 +413,22 @@ class Menu:
         print(Utils.colored_text("Invalid choice. Please try again.", Color.RED))
 
 
+class MenuBuilder:
+    """Numbers menu entries in the order they are added."""
+
+    def __init__(self) -> None:
+        self.menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {}
+        self._index: int = 0
+
+    def add(self, item: Union[Menu.Item, Menu.Separator]) -> None:
+        self._index += 1
+        self.menu_items[self._index] = item
+
+
+# Every menu shares the same Exit entry
+_EXIT_ITEM = Menu.Item("Exit", sys.exit)
+
+
 class Validator:
     """A utility class for common validation checks."""
 
@@ -315,13 +438,7 @@ class Validator:
         )
 
     def validate_device(self, device: str, type: str) -> bool:
-        if type == "CAN":
-            device_regex = r"^[a-f0-9]{12}$"
-        elif type == "USB":
-            device_regex = r".*Cartographer.*"
-        else:
-            device_regex = r"^[a-f0-9]{4}:[a-f0-9]{4}$"
-        return bool(re.match(device_regex, device))
+        return _DEVICE_RE.get(type, _DFU_RE).match(device) is not None
 
     def check_selected_firmware(self):
         if not self.firmware.selected_firmware:
@@ -378,7 +495,23 @@ class Firmware:
         self.dfu = Dfu(
             self, debug=self.debug, ftype=self.ftype
         )  # Pass Firmware instance to CAN
+        # Per flash method menu and flasher, looked up by the menu flow
+        self._flash_menus: Dict[FlashMethod, Callable[[], None]] = {
+            FlashMethod.CAN: self.can.menu,
+            FlashMethod.USB: self.usb.menu,
+            FlashMethod.DFU: self.dfu.menu,
+        }
+        self._flash_devices: Dict[FlashMethod, Callable[[str, str], None]] = {
+            FlashMethod.CAN: self.can.flash_device,
+            FlashMethod.USB: self.usb.flash_device,
+            FlashMethod.DFU: self.dfu.flash_device,
+        }
         self.validator: Validator = Validator(self)  # Initialize the Validator
+        self.retrieve: Optional[RetrieveFirmware] = None
+        # Main menu items along with the toggle state they were built for
+        self._main_menu_cache: Optional[
+            Tuple[Tuple[object, ...], Dict[int, Union[Menu.Item, Menu.Separator]]]
+        ] = None
 
     def set_device(self, device: str):
         self.selected_device = device
@@ -396,11 +529,7 @@ class Firmware:
         """
         Handle device initialization based on the flash type and device UUID.
         """
-        handlers: Dict[str, Callable[[], None]] = {
-            FlashMethod.CAN: self.can.menu,
-            FlashMethod.USB: self.usb.menu,
-            FlashMethod.DFU: self.dfu.menu,
-        }
+        handlers = self._flash_menus
 
         if self.device and self.flash in handlers:
             # Validate the device
@@ -419,93 +548,83 @@ class Firmware:
         # Fall back to the main menu if no valid condition is met
         self.main_menu()
 
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def filename_filter(
+        search_pattern: str, exclude_patterns: Tuple[str, ...]
+    ) -> "re.Pattern[str]":
+        """Compile the globs into one regex, excludes as a negative lookahead."""
+        include = fnmatch.translate(search_pattern)
+        excludes = "|".join(f"(?:{fnmatch.translate(p)})" for p in exclude_patterns)
+        return re.compile(f"(?!{excludes})(?:{include})" if excludes else include)
+
     def find_firmware_files(
         self,
         base_dir: str,
         search_pattern: str = "*",
         exclude_pattern: Optional[Union[str, List[str]]] = None,
         high_temp: bool = False,
-    ) -> List[FirmwareFile]:
+    ) -> Dict[str, List[str]]:
         if not os.path.isdir(base_dir):
             print(f"Base directory does not exist: {base_dir}")
-            return []
+            return {}
 
-        firmware_files: List[FirmwareFile] = []
+        # Firmware filenames grouped by their subdirectory
+        firmware_groups: Dict[str, List[str]] = {}
 
-        # Traverse the directory structure
-        for root, _, files in os.walk(base_dir):
-            subdirectory = os.path.relpath(
-                root, base_dir
-            )  # Relative path of the subdirectory
-
-            # Check high_temp condition
-            if high_temp != ("HT" in subdirectory):
-                continue
+        if isinstance(exclude_pattern, str):
+            exclude_pattern = [exclude_pattern]
+        filename_re = Firmware.filename_filter(
+            search_pattern, tuple(exclude_pattern or ())
+        )
 
-            for file in files:
-                if not file.endswith(".bin"):  # Skip non-.bin files early
-                    continue
+        def walk(path: str, rel: str = "") -> Iterator[Tuple[str, str]]:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if entry.is_symlink():
+                            continue
+                        sub_rel = os.path.join(rel, entry.name) if rel else entry.name
+                        # "HT" only ever gets added going down the tree, so a
+                        # high-temp subtree can be skipped entirely otherwise
+                        if not high_temp and "HT" in sub_rel:
+                            continue
+                        yield from walk(entry.path, sub_rel)
+                    elif entry.name.endswith(".bin"):  # Skip non-.bin files early
+                        # Check high_temp condition
+                        if high_temp != ("HT" in rel):
+                            continue
+                        yield rel or ".", entry.name
 
-                if not fnmatch.fnmatch(
-                    file, search_pattern
-                ):  # Skip files that don't match the inclusion pattern
-                    continue
+        # Traverse the directory structure
+        for subdirectory, file in walk(base_dir):
+            # Skip files that are excluded or don't match the inclusion pattern
+            if not filename_re.match(file):
+                continue
 
-                # Handle exclusion patterns
-                if exclude_pattern:
-                    if isinstance(exclude_pattern, list):
-                        # Skip files matching any pattern in the list
-                        if any(
-                            fnmatch.fnmatch(file, pattern)
-                            for pattern in exclude_pattern
-                        ):
-                            continue
-                    elif fnmatch.fnmatch(
-                        file, exclude_pattern
-                    ):  # Single exclude pattern
-                        continue
-
-                # Add valid firmware files to the list
-                firmware_files.append(
-                    FirmwareFile(subdirectory=subdirectory, filename=file)
-                )
+            # Add valid firmware files to their subdirectory's group
+            firmware_groups.setdefault(subdirectory, []).append(file)
 
-        return sorted(
-            firmware_files, key=lambda f: f.subdirectory
-        )  # Sort by subdirectory
+        return dict(sorted(firmware_groups.items()))  # Sort by subdirectory
 
-    def select_latest(self, firmware_files: List[FirmwareFile], type: FlashMethod):
-        if not firmware_files:
+    def select_latest(self, firmware_groups: Dict[str, List[str]], type: FlashMethod):
+        if not firmware_groups:
             print("No firmware files found.")
             return
 
-        # Extract unique subdirectory names
-        subdirectories: Set[str] = {file[0] for file in firmware_files}
-        if not subdirectories:
-            print("No valid subdirectories found.")
-            return
-
         latest_subdirectory: str = max(
-            subdirectories,
+            firmware_groups,
             key=lambda d: VersionParser.from_string(
                 os.path.basename(d)
             ),  # Parse version
         )
-        # Filter firmware files in the latest subdirectory
-        latest_firmware_files = [
-            (subdirectory, file)
-            for subdirectory, file in firmware_files
-            if subdirectory == latest_subdirectory
-        ]
 
         # Select the first firmware file in the latest subdirectory
-        if latest_firmware_files:
-            subdirectory, file = latest_firmware_files[0]
-            firmware_path = os.path.join(subdirectory, file)  # Construct the full path
-            self.select_firmware(firmware_path, type)
-            self.main_menu()
-        else:
-            print("No firmware files found in the latest subdirectory.")
+        firmware_path = os.path.join(
+            latest_subdirectory, firmware_groups[latest_subdirectory][0]
+        )  # Construct the full path
+        self.select_firmware(firmware_path, type)
+        self.main_menu()
 
     def set_advanced(self):
         global is_advanced
@@ -546,8 +665,9 @@ class Firmware:
         self.main_menu()
 
     def set_mode(self, mode: str):
-        if mode:
-            self.flash = args.flash = FlashMethod[mode]
+        method = _FLASH_METHODS.get(mode)
+        if method is not None:
+            self.flash = args.flash = method
         else:
             Utils.error_msg("You didnt specify a mode to use.")
         self.mode_menu()
@@ -571,74 +691,98 @@ class Firmware:
     # Create main menu
     def main_menu(self) -> None:
         # Handle advanced mode and flash settings
-        if is_advanced or self.flash == FlashMethod["DFU"]:
+        if is_advanced or self.flash == FlashMethod.DFU:
             self.all = True
 
         Utils.header()
         self.selected_device = None
         self.selected_firmware = None
 
+        # Reuse the previous items unless one of the toggles changed
+        state = (
+            is_advanced,
+            self.debug,
+            self.kseries,
+            self.ftype,
+            self.high_temp,
+            self.flash,
+            self.branch,
+        )
+        if self._main_menu_cache is None or self._main_menu_cache[0] != state:
+            self._main_menu_cache = (state, self.build_main_menu())
+
+        # Create and display the menu
+        menu = Menu("Main Menu", self._main_menu_cache[1])
+        menu.display()
+
+    def build_main_menu(self) -> Dict[int, Union[Menu.Item, Menu.Separator]]:
         # Define base menu items
-        menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {
-            1: Menu.Item(
+        builder = MenuBuilder()
+        builder.add(
+            Menu.Item(
                 "Katapult - CAN    "
                 + Utils.colored_text("[For Flashing via CAN]", Color.YELLOW),
                 self.can.menu,
-            ),
-            2: Menu.Item(
+            )
+        )
+        builder.add(
+            Menu.Item(
                 "Katapult - USB    "
                 + Utils.colored_text("[For Flashing via USB]", Color.YELLOW),
                 self.usb.menu,
-            ),
-            3: Menu.Item(
+            )
+        )
+        builder.add(
+            Menu.Item(
                 "DFU               "
                 + Utils.colored_text("[For Flashing with DFU via USB]", Color.YELLOW),
                 self.dfu.menu,
-            ),
-        }
+            )
+        )
 
         # Add advanced or basic options
-        self.add_advanced_options(menu_items, is_advanced)
+        self.add_advanced_options(builder, is_advanced)
 
         # Add Exit option
-        menu_items[len(menu_items) + 1] = Menu.Separator()
-        menu_items[0] = Menu.Item("Exit", lambda: exit())
-
-        # Create and display the menu
-        menu = Menu("Main Menu", menu_items)
-        menu.display()
+        builder.add(Menu.Separator())
+        builder.menu_items[0] = _EXIT_ITEM
+        return builder.menu_items
 
     def add_advanced_options(
         self,
-        menu_items: Dict[int, Union[Menu.Item, Menu.Separator]],
+        builder: MenuBuilder,
         is_advanced: bool,
     ) -> None:
         """Add advanced or basic options to the menu."""
-        menu_items[len(menu_items) + 1] = Menu.Separator()
+        builder.add(Menu.Separator())
 
         # Advanced mode toggle
         mode_text = (
             "Enable Advanced Mode" if not is_advanced else "Disable Advanced Mode"
         )
         mode_color = Color.GREEN if not is_advanced else Color.RED
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            Utils.colored_text(mode_text, mode_color), self.set_advanced
+        builder.add(
+            Menu.Item(Utils.colored_text(mode_text, mode_color), self.set_advanced)
         )
 
         if is_advanced:
             # Add advanced options
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                Utils.colored_text("Switch Flash Mode", Color.CYAN), self.mode_menu
+            builder.add(Menu.Separator())
+            builder.add(
+                Menu.Item(
+                    Utils.colored_text("Switch Flash Mode", Color.CYAN), self.mode_menu
+                )
             )
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                Utils.colored_text("Switch Branch", Color.CYAN), self.branch_menu
+            builder.add(
+                Menu.Item(
+                    Utils.colored_text("Switch Branch", Color.CYAN), self.branch_menu
+                )
             )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
+            builder.add(Menu.Separator())
 
             # Debugging toggle
             self.add_toggle_item(
-                menu_items,
+                builder,
                 "Debugging",
                 self.debug,
                 self.set_debugging,
@@ -646,7 +790,7 @@ class Firmware:
 
             # K Series firmware toggle
             self.add_toggle_item(
-                menu_items,
+                builder,
                 "Creality K Series Firmware",
                 self.kseries,
                 self.set_kseries,
@@ -654,7 +798,7 @@ class Firmware:
 
             # Katapult Bootloader toggle
             self.add_toggle_item(
-                menu_items,
+                builder,
                 "Katapult Bootloader Firmware",
                 self.ftype,
                 self.set_ftype,
@@ -662,7 +806,7 @@ class Firmware:
 
             # High Temp firmware toggle
             self.add_toggle_item(
-                menu_items,
+                builder,
                 "High Temp Firmware (HT Probes ONLY)",
                 self.high_temp,
                 self.set_high_temp,
@@ -670,7 +814,7 @@ class Firmware:
 
     def add_toggle_item(
         self,
-        menu_items: Dict[int, Union[Menu.Item, Menu.Separator]],
+        builder: MenuBuilder,
         name: str,
         state: bool,
         action: Callable[[], None],
@@ -678,14 +822,12 @@ class Firmware:
         """Helper function to add toggleable menu items."""
         text = f"Enable {name}" if not state else f"Disable {name}"
         color = Color.GREEN if not state else Color.RED
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            Utils.colored_text(text, color), action
-        )
+        builder.add(Menu.Item(Utils.colored_text(text, color), action))
 
     def mode_menu(self):
         Utils.header()
 
-        selected_text = Utils.colored_text("(selected)", Color.GREEN)
+        selected_text = _LBL_SELECTED
 
         # Prepare modes and mark the selected mode
         modes = {
@@ -696,26 +838,24 @@ class Firmware:
         }
 
         # Prepare menu items dynamically
-        menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {
-            idx + 1: Menu.Item(
-                modes[method],
-                lambda m=method: self.set_mode(
-                    m
-                ),  # Use a lambda to pass the method correctly
+        builder = MenuBuilder()
+        for method in FlashMethod:
+            builder.add(
+                Menu.Item(
+                    modes[method],
+                    lambda m=method: self.set_mode(
+                        m
+                    ),  # Use a lambda to pass the method correctly
+                )
             )
-            for idx, method in enumerate(FlashMethod)
-        }
-        menu_items[len(menu_items) + 1] = Menu.Separator()
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            Utils.colored_text("Back to Main Menu", Color.CYAN),
-            self.main_menu,
-        )
-        menu_items[len(menu_items) + 1] = Menu.Separator()
+        builder.add(Menu.Separator())
+        builder.add(Menu.Item(_LBL_BACK_TO_MAIN_MENU, self.main_menu))
+        builder.add(Menu.Separator())
         # Add the "Exit" option last
-        menu_items[0] = Menu.Item("Exit", lambda: exit())
+        builder.menu_items[0] = _EXIT_ITEM
 
         # Create and display the menu
-        menu = Menu("Select a flashing mode", menu_items)
+        menu = Menu("Select a flashing mode", builder.menu_items)
         menu.display()
 
     def branch_menu(self):
@@ -733,7 +873,7 @@ class Firmware:
         Utils.header()
         display_branch_table()
 
-        selected_text = Utils.colored_text("(selected)", Color.GREEN)
+        selected_text = _LBL_SELECTED
 
         # Define branch names and mark the selected branch
         branches = {
@@ -752,35 +892,19 @@ class Firmware:
             custom_branch_label = "Custom Branch"
 
         # Prepare menu items
-        menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {}
-
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            branches["master"],
-            lambda: self.set_branch("master"),
-        )
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            branches["beta"],
-            lambda: self.set_branch("beta"),
-        )
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            branches["develop"],
-            lambda: self.set_branch("develop"),
-        )
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            custom_branch_label,
-            self.set_custom_branch,
-        )
-        menu_items[len(menu_items) + 1] = Menu.Separator()
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            Utils.colored_text("Back to Main Menu", Color.CYAN),
-            self.main_menu,
-        )
-        menu_items[len(menu_items) + 1] = Menu.Separator()
+        builder = MenuBuilder()
+        builder.add(Menu.Item(branches["master"], lambda: self.set_branch("master")))
+        builder.add(Menu.Item(branches["beta"], lambda: self.set_branch("beta")))
+        builder.add(Menu.Item(branches["develop"], lambda: self.set_branch("develop")))
+        builder.add(Menu.Item(custom_branch_label, self.set_custom_branch))
+        builder.add(Menu.Separator())
+        builder.add(Menu.Item(_LBL_BACK_TO_MAIN_MENU, self.main_menu))
+        builder.add(Menu.Separator())
         # Add the "Exit" option last
-        menu_items[0] = Menu.Item("Exit", lambda: exit())
+        builder.menu_items[0] = _EXIT_ITEM
 
         # Create and display the menu
-        menu = Menu("Select a Branch to Flash From", menu_items)
+        menu = Menu("Select a Branch to Flash From", builder.menu_items)
         menu.display()
 
     def display_device(self):
@@ -798,55 +922,52 @@ class Firmware:
             )
 
     def display_firmware_menu(
-        self, firmware_files: List[FirmwareFile], type: FlashMethod
+        self, firmware_groups: Dict[str, List[str]], type: FlashMethod
     ):
-        if firmware_files:
+        if firmware_groups:
             # Define menu items for firmware files
-            menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {
-                index: Menu.Item(
-                    f"{file.subdirectory}/{file.filename}",
-                    lambda file=file: self.select_firmware(
-                        os.path.join(file.subdirectory, file.filename), type
-                    ),
-                )
-                for index, file in enumerate(firmware_files, start=1)
-            }
-            menu_items[len(menu_items) + 1] = Menu.Separator()
+            builder = MenuBuilder()
+            for subdirectory, files in firmware_groups.items():
+                for file in files:
+                    path = os.path.join(subdirectory, file)
+                    builder.add(
+                        Menu.Item(
+                            f"{subdirectory}/{file}",
+                            lambda path=path: self.select_firmware(path, type),
+                        )
+                    )
+            builder.add(Menu.Separator())
             # Add static options after firmware options
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                "Check Again", lambda: self.firmware_menu(type)
-            )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[len(menu_items) + 1] = Menu.Item("Back", self.can.menu)
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                Utils.colored_text("Back to main menu", Color.CYAN), self.main_menu
+            builder.add(
+                Menu.Item(
+                    "Check Again", lambda: self.firmware_menu(type, force_refresh=True)
+                )
             )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[0] = Menu.Item("Exit", lambda: exit())  # Add Exit explicitly
+            builder.add(Menu.Separator())
+            builder.add(Menu.Item("Back", self.can.menu))
+            builder.add(Menu.Item(_LBL_BACK_TO_MAIN, self.main_menu))
+            builder.add(Menu.Separator())
+            # Add Exit explicitly
+            builder.menu_items[0] = _EXIT_ITEM
 
             # Create and display the menu
-            menu = Menu("Select Firmware", menu_items)
+            menu = Menu("Select Firmware", builder.menu_items)
             menu.display()
         else:
             print("No firmware files found.")
 
     def select_firmware(self, firmware: str, type: FlashMethod):
         self.set_firmware(firmware)
-        menu_handlers: Dict[str, Callable[[], None]] = {
-            FlashMethod.CAN: self.can.menu,
-            FlashMethod.USB: self.usb.menu,
-            FlashMethod.DFU: self.dfu.menu,
-        }
 
         # Retrieve the appropriate handler and call it if valid
-        handler = menu_handlers.get(type)
+        handler = self._flash_menus.get(type)
         if handler:
             handler()  # Call the appropriate menu method
         else:
             Utils.error_msg("You have not selected a valid firmware file.")
 
     # Show a list of available firmware
-    def firmware_menu(self, type: FlashMethod):
+    def firmware_menu(self, type: FlashMethod, force_refresh: bool = False):
         if not type:
             raise ValueError("type cannot be None or empty")
         # Get the bitrate from CAN interface
@@ -854,7 +975,7 @@ class Firmware:
 
         # Determine search pattern and exclusion pattern
         exclude_pattern = None
-        firmware_files = []  # Initialize firmware_files to avoid reference errors
+        firmware_groups = {}  # Initialize firmware_groups to avoid reference errors
 
         if type == FlashMethod.CAN:
             search_pattern = f"*{bitrate}*" if bitrate else "*"
@@ -871,13 +992,22 @@ class Firmware:
         Utils.header()
         Utils.page(f"{type.value} Firmware Menu")
 
-        # Initialize and retrieve firmware only when this method is called
-        self.retrieve: RetrieveFirmware = RetrieveFirmware(
-            self, branch=self.branch, debug=self.debug
-        )
-        self.retrieve.main()
-
-        self.dir_path = self.retrieve.temp_dir_exists()  # Call the method
+        # Reuse the last download unless the branch changed, the files were
+        # cleaned up, or the user asked to check again
+        retrieve = self.retrieve
+        self.dir_path = None
+        if (
+            not force_refresh
+            and retrieve is not None
+            and (retrieve.branch, retrieve.debug) == (self.branch, self.debug)
+        ):
+            self.dir_path = retrieve.temp_dir_exists()
+        if self.dir_path is None:
+            # Initialize and retrieve firmware only when this method is called
+            self.retrieve = RetrieveFirmware(self, branch=self.branch, debug=self.debug)
+            self.retrieve.main()
+
+            self.dir_path = self.retrieve.temp_dir_exists()  # Call the method
 
         if self.dir_path:
             # Start with the base path
@@ -895,13 +1025,13 @@ class Firmware:
 
             # Update self.dir_path only once
             self.dir_path = base_path
-            firmware_files = self.find_firmware_files(
+            firmware_groups = self.find_firmware_files(
                 self.dir_path, search_pattern, exclude_pattern, self.high_temp
             )
             if not self.all:
-                self.select_latest(firmware_files, type)
+                self.select_latest(firmware_groups, type)
             else:
-                self.display_firmware_menu(firmware_files, type)
+                self.display_firmware_menu(firmware_groups, type)
 
     # Confirm the user wants to flash the correct device & file
     def confirm(self, type: FlashMethod):
@@ -923,21 +1053,16 @@ class Firmware:
             Utils.colored_text("Firmware to Flash:", Color.MAGENTA),
             self.selected_firmware,
         )
-        if type not in {FlashMethod.CAN, FlashMethod.USB, FlashMethod.DFU}:
+        menu_method = self._flash_menus.get(type)
+        if menu_method is None:
             Utils.error_msg("Invalid Flash Method")
-
-        if type == FlashMethod.CAN:
-            menu_method = self.can.menu
-        elif type == FlashMethod.USB:
-            menu_method = self.usb.menu
-        elif type == FlashMethod.DFU:
-            menu_method = self.dfu.menu
+            return
 
         print("\nAre these details correct?")
         menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {
             1: Menu.Item("Yes, proceed to flash", lambda: self.firmware_flash(type)),
             2: Menu.Item(f"No, return to {type.upper()} menu", menu_method),
-            0: Menu.Item("Exit", lambda: exit()),  # Explicit exit option
+            0: _EXIT_ITEM,  # Explicit exit option
         }
 
         # Display confirmation menu
@@ -958,17 +1083,15 @@ class Firmware:
             Utils.error_msg("No device selected. Please select a device first.")
             return
         # Ensure the firmware file exists
-        if not os.path.exists(firmware_file):
+        if not os.path.isfile(firmware_file):
             Utils.error_msg(f"Firmware file not found: {firmware_file}")
+            return
 
-        if type == "CAN":
-            self.can.flash_device(firmware_file, self.selected_device)
-        elif type == "USB":
-            self.usb.flash_device(firmware_file, self.selected_device)
-        elif type == "DFU":
-            self.dfu.flash_device(firmware_file, self.selected_device)
-        else:
+        flash_device = self._flash_devices.get(type)
+        if flash_device is None:
             Utils.error_msg("You didnt select a valid flashing method")
+            return
+        flash_device(firmware_file, self.selected_device)
 
     # If flash was a success
     def flash_success(self, result: str):
@@ -1001,32 +1124,46 @@ class Can:
         self.firmware: Firmware = firmware
         self.validator: Validator = Validator(firmware)
         self.katapult_installer: Optional[KatapultInstaller] = None
+        self._katapult_ready: bool = False
         self.debug: bool = debug
         self.ftype: bool = ftype
         self.selected_device: Optional[str] = None
         self.selected_firmware: Optional[str] = None
+        self._bitrates: Dict[str, str] = {}  # interface -> bitrate
 
     def katapult_check(self) -> bool:
-        if not os.path.exists(KATAPULT_DIR):
-            return False
-        return True
+        # Katapult doesn't get uninstalled while we run, so stop checking once found
+        if not self._katapult_ready:
+            self._katapult_ready = os.path.exists(KATAPULT_DIR)
+        return self._katapult_ready
 
     def get_bitrate(self, interface: str = "can0"):
+        # The interface bitrate doesn't change while flashing, so only ask once.
+        # A failed lookup isn't kept, the interface may be brought up later.
+        bitrate = self._bitrates.get(interface)
+        if bitrate is not None:
+            return bitrate
+
+        import subprocess
+
         try:
-            command = f"ip -s -d link show {interface}"
-            result = os.popen(
-                command
-            ).read()  # Use subprocess for better control in production
-            bitrate_match = re.search(r"bitrate\s(\d+)", result)
-            if bitrate_match:
-                return bitrate_match.group(1)
-            else:
+            command = ["ip", "-s", "-d", "link", "show", interface]
+            result = subprocess.run(
+                command, text=True, capture_output=True, check=False
+            )
+            bitrate_match = _BITRATE_RE.search(result.stdout)
+            if not bitrate_match:
                 return None
         except Exception as e:
             Utils.error_msg(f"Error retrieving bitrate: {e}")
             return None
+        bitrate = bitrate_match.group(1)
+        self._bitrates[interface] = bitrate
+        return bitrate
 
     def check_can_network(self) -> bool:
+        import subprocess
+
         try:
             # Run the command
             command = ["ip", "-s", "-d", "link"]
@@ -1081,32 +1218,33 @@ class Can:
         self.selected_firmware = self.firmware.get_firmware()
 
         # Base menu items
-        menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {
-            1: Menu.Item("Find Cartographer Device", self.device_menu),
-            2: Menu.Item(
+        builder = MenuBuilder()
+        builder.add(Menu.Item("Find Cartographer Device", self.device_menu))
+        builder.add(
+            Menu.Item(
                 "Find CAN Firmware",
                 lambda: self.firmware.firmware_menu(type=FlashMethod.CAN),
-            ),
-        }
+            )
+        )
 
         # Dynamically add "Flash Selected Firmware" if conditions are met
         if self.selected_firmware and self.selected_device:
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                "Flash Selected Firmware",
-                lambda: self.firmware.confirm(type=FlashMethod.CAN),
+            builder.add(Menu.Separator())
+            builder.add(
+                Menu.Item(
+                    "Flash Selected Firmware",
+                    lambda: self.firmware.confirm(type=FlashMethod.CAN),
+                )
             )
-        menu_items[len(menu_items) + 1] = Menu.Separator()
+        builder.add(Menu.Separator())
         # Add "Back to main menu" after "Flash Selected Firmware"
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            Utils.colored_text("Back to main menu", Color.CYAN), self.firmware.main_menu
-        )
-        menu_items[len(menu_items) + 1] = Menu.Separator()
+        builder.add(Menu.Item(_LBL_BACK_TO_MAIN, self.firmware.main_menu))
+        builder.add(Menu.Separator())
         # Add exit option explicitly at the end
-        menu_items[0] = Menu.Item("Exit", lambda: exit())
+        builder.menu_items[0] = _EXIT_ITEM
 
         # Create and display the menu
-        menu = Menu("What would you like to do?", menu_items)
+        menu = Menu("What would you like to do?", builder.menu_items)
         menu.display()
 
     def device_menu(self):
@@ -1122,11 +1260,11 @@ class Can:
                 self.menu,
             ),
             6: Menu.Item(
-                Utils.colored_text("Back to main menu", Color.CYAN),
+                _LBL_BACK_TO_MAIN,
                 self.firmware.main_menu,
             ),
             7: Menu.Separator(),  # Blank separator
-            0: Menu.Item("Exit", lambda: exit()),  # Add exit option explicitly
+            0: _EXIT_ITEM,  # Add exit option explicitly
         }
 
         # Create and display the menu
@@ -1134,6 +1272,8 @@ class Can:
         menu.display()
 
     def query_devices(self):
+        import subprocess
+
         Utils.header()
         Utils.page("Querying CAN devices..")
         detected_uuids: list[str] = []
@@ -1153,7 +1293,7 @@ class Can:
                     self.menu,
                 ),
                 3: Menu.Separator(),  # Blank separator
-                0: Menu.Item("Exit", lambda: exit()),  # Add exit option explicitly
+                0: _EXIT_ITEM,  # Add exit option explicitly
             }
 
             # Create and display the menu
@@ -1176,16 +1316,9 @@ class Can:
                         print("Available CAN Devices:")
                         print("=" * 40)
                         # Extract and display each detected UUID
-                        for line in output.splitlines():
-                            if "Detected UUID" in line:
-                                # Strip unnecessary parts and keep only the UUID
-                                uuid = (
-                                    line.split(",")[0]
-                                    .replace("Detected UUID: ", "")
-                                    .strip()
-                                )
-                                print(uuid)
-                                detected_uuids.append(uuid)
+                        detected_uuids = _UUID_RE.findall(output)
+                        for uuid in detected_uuids:
+                            print(uuid)
                         print("=" * 40)
                     else:
                         Utils.error_msg("No CAN devices found.")
@@ -1201,28 +1334,30 @@ class Can:
                 self.menu()
             finally:
                 # Define menu items, starting with UUID options
-                menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {}
-                for index, uuid in enumerate(detected_uuids, start=1):
-                    menu_items[index] = Menu.Item(
-                        f"Select {uuid}", lambda uuid=uuid: self.select_device(uuid)
+                builder = MenuBuilder()
+                for uuid in detected_uuids:
+                    builder.add(
+                        Menu.Item(
+                            f"Select {uuid}", lambda uuid=uuid: self.select_device(uuid)
+                        )
                     )
-                menu_items[len(menu_items) + 1] = Menu.Separator()
+                builder.add(Menu.Separator())
                 # Add static options after UUID options
-                menu_items[len(menu_items) + 1] = Menu.Item(
-                    "Check Again", self.query_devices
-                )
-                menu_items[len(menu_items) + 1] = Menu.Separator()
-                menu_items[len(menu_items) + 1] = Menu.Item("Back", self.device_menu)
-                menu_items[len(menu_items) + 1] = Menu.Item(
-                    Utils.colored_text("Back to main menu", Color.CYAN),
-                    self.firmware.main_menu,
+                builder.add(Menu.Item("Check Again", self.query_devices))
+                builder.add(Menu.Separator())
+                builder.add(Menu.Item("Back", self.device_menu))
+                builder.add(
+                    Menu.Item(
+                        _LBL_BACK_TO_MAIN,
+                        self.firmware.main_menu,
+                    )
                 )
-                menu_items[len(menu_items) + 1] = Menu.Separator()
+                builder.add(Menu.Separator())
                 # Add the Exit option explicitly
-                menu_items[0] = Menu.Item("Exit", lambda: exit())
+                builder.menu_items[0] = _EXIT_ITEM
 
                 # Create and display the menu
-                menu = Menu("Options", menu_items)
+                menu = Menu("Options", builder.menu_items)
                 menu.display()
 
     # find can uuid from klippy.log
@@ -1237,67 +1372,71 @@ class Can:
                 )
                 self.menu()
 
-            mcu_scanner_uuids: list[str] = []  # UUIDs with [mcu scanner] above them
-            scanner_uuids: list[str] = []  # UUIDs with [scanner] above them
-            regular_uuids: list[str] = []  # UUIDs without either tag
-
-            with open(KLIPPY_LOG, "r") as log_file:
-                lines = log_file.readlines()
-
-            # Parse the log to find UUIDs and their contexts
-            for index, line in enumerate(lines):
-                if "canbus_uuid =" in line:
-                    # Extract the UUID
-                    uuid = line.split("canbus_uuid =")[-1].strip()
-
-                    # Check for [mcu scanner] or [scanner] in preceding lines
-                    if index > 0 and "[mcu scanner]" in lines[index - 1]:
-                        if uuid not in mcu_scanner_uuids:  # Avoid duplicates
-                            mcu_scanner_uuids.append(uuid)
-                    elif index > 0 and "[scanner]" in lines[index - 1]:
-                        if uuid not in scanner_uuids:  # Avoid duplicates
-                            scanner_uuids.append(uuid)
-                    else:
-                        if uuid not in regular_uuids:  # Avoid duplicates
-                            regular_uuids.append(uuid)
+            # Dicts keep first-seen order while deduplicating in O(1)
+            mcu_scanner_uuids: dict[str, None] = {}  # With [mcu scanner] above
+            scanner_uuids: dict[str, None] = {}  # With [scanner] above them
+            regular_uuids: dict[str, None] = {}  # UUIDs without either tag
+
+            # Stream the log, only keeping the previous line for context
+            with open(KLIPPY_LOG, "r", buffering=1 << 16) as log_file:
+                prev_line = ""
+                for line in log_file:
+                    if CANBUS_UUID_KEY in line:
+                        # Extract the UUID
+                        uuid = line.split(CANBUS_UUID_KEY)[-1].strip()
+
+                        # Check for [mcu scanner] or [scanner] in the preceding line
+                        if MCU_SCANNER_SECTION in prev_line:
+                            _ = mcu_scanner_uuids.setdefault(uuid)
+                        elif SCANNER_SECTION in prev_line:
+                            _ = scanner_uuids.setdefault(uuid)
+                        else:
+                            _ = regular_uuids.setdefault(uuid)
+                    prev_line = line
 
             # Combine all categories: MCU scanner first, then scanner, then regular
-            detected_uuids = mcu_scanner_uuids + scanner_uuids + regular_uuids
+            detected_uuids = [*mcu_scanner_uuids, *scanner_uuids, *regular_uuids]
 
             # Prepare the menu
-            menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {}
-            for idx, uuid in enumerate(detected_uuids, start=1):
+            builder = MenuBuilder()
+            for uuid in detected_uuids:
                 if uuid in mcu_scanner_uuids:
-                    menu_items[idx] = Menu.Item(
-                        f"Select {uuid} (MCU Scanner)",
-                        lambda uuid=uuid: self.select_device(uuid),
+                    builder.add(
+                        Menu.Item(
+                            f"Select {uuid} (MCU Scanner)",
+                            lambda uuid=uuid: self.select_device(uuid),
+                        )
                     )
                 elif uuid in scanner_uuids:
-                    menu_items[idx] = Menu.Item(
-                        f"Select {uuid} (Potential match)",
-                        lambda uuid=uuid: self.select_device(uuid),
+                    builder.add(
+                        Menu.Item(
+                            f"Select {uuid} (Potential match)",
+                            lambda uuid=uuid: self.select_device(uuid),
+                        )
                     )
                 else:
-                    menu_items[idx] = Menu.Item(
-                        f"Select {uuid}", lambda uuid=uuid: self.select_device(uuid)
+                    builder.add(
+                        Menu.Item(
+                            f"Select {uuid}", lambda uuid=uuid: self.select_device(uuid)
+                        )
                     )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
+            builder.add(Menu.Separator())
             # Add static options after UUID options
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                "Check Again", self.search_klippy
-            )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[len(menu_items) + 1] = Menu.Item("Back", self.device_menu)
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                Utils.colored_text("Back to main menu", Color.CYAN),
-                self.firmware.main_menu,
+            builder.add(Menu.Item("Check Again", self.search_klippy))
+            builder.add(Menu.Separator())
+            builder.add(Menu.Item("Back", self.device_menu))
+            builder.add(
+                Menu.Item(
+                    _LBL_BACK_TO_MAIN,
+                    self.firmware.main_menu,
+                )
             )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
+            builder.add(Menu.Separator())
             # Add the Exit option explicitly
-            menu_items[0] = Menu.Item("Exit", lambda: exit())
+            builder.menu_items[0] = _EXIT_ITEM
 
             # Create and display the menu
-            menu = Menu("Options", menu_items)
+            menu = Menu("Options", builder.menu_items)
             menu.display()
 
         except FileNotFoundError:
@@ -1312,6 +1451,8 @@ class Can:
             self.menu()
 
     def flash_device(self, firmware_file: str, device: str):
+        import subprocess
+
         try:
             self.validator.check_selected_device()
             self.validator.check_selected_firmware()
@@ -1328,17 +1469,23 @@ class Can:
                 device,  # Selected device UUID
             ]
 
+            # Merge stderr into stdout so a single pipe is drained and the
+            # flasher can never block on a full, unread stderr pipe
             process = subprocess.Popen(
                 command,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
+                bufsize=1,
             )
 
-            # Print stdout as it happens
+            # Print output as it happens, keeping the tail for error reports
+            output: list[str] = []
             if process.stdout is not None:
-                for line in process.stdout:
+                for line in iter(process.stdout.readline, ""):
                     print(line.strip())
+                    output.append(line.strip())
+                    del output[:-10]
 
             # Wait for the process to complete
             _ = process.wait()
@@ -1348,13 +1495,9 @@ class Can:
                 _ = input("Press enter to continue..")
                 self.firmware.flash_success("Firmware flashed successfully.")
             else:
-                stderr_output = (
-                    process.stderr.read().strip()
-                    if process.stderr is not None
-                    else "No error details available."
-                )
+                error_output = "\n".join(output) or "No error details available."
                 _ = input("Press enter to continue..")
-                self.firmware.flash_fail(f"Error flashing firmware: {stderr_output}")
+                self.firmware.flash_fail(f"Error flashing firmware: {error_output}")
 
         except subprocess.CalledProcessError as e:
             stderr_output = (
@@ -1372,15 +1515,17 @@ class Usb:
         self.firmware: Firmware = firmware
         self.validator: Validator = Validator(firmware)
         self.katapult_installer: Optional[KatapultInstaller] = None
+        self._katapult_ready: bool = False
         self.debug: bool = debug
         self.ftype: bool = ftype
         self.selected_device: Optional[str] = None
         self.selected_firmware: Optional[str] = None
 
     def katapult_check(self) -> bool:
-        if not os.path.exists(KATAPULT_DIR):
-            return False
-        return True
+        # Katapult doesn't get uninstalled while we run, so stop checking once found
+        if not self._katapult_ready:
+            self._katapult_ready = os.path.exists(KATAPULT_DIR)
+        return self._katapult_ready
 
     def select_device(self, device: str):
         self.selected_device = device  # Save the selected device globally
@@ -1406,7 +1551,7 @@ class Usb:
                     self.menu,
                 ),
                 3: Menu.Separator(),  # Blank separator
-                0: Menu.Item("Exit", lambda: exit()),  # Add exit option explicitly
+                0: _EXIT_ITEM,  # Add exit option explicitly
             }
 
             # Create and display the menu
@@ -1416,14 +1561,11 @@ class Usb:
             detected_devices: List[str] = []
             try:
                 # List all devices in /dev/serial/by-id/
-                base_path = "/dev/serial/by-id/"
-                if not os.path.exists(base_path):
-                    Utils.error_msg(f"Path '{base_path}' does not exist.")
+                if not os.path.exists(SERIAL_BY_ID_DIR):
+                    Utils.error_msg(f"Path '{SERIAL_BY_ID_DIR}' does not exist.")
                     self.menu()
 
-                for device in os.listdir(base_path):
-                    if "Cartographer" in device or "katapult" in device:
-                        detected_devices.append(device)
+                detected_devices = Utils.scan_by_id()
 
                 if not detected_devices:
                     Utils.error_msg(
@@ -1443,28 +1585,31 @@ class Usb:
                 self.menu()
 
             # Define menu items, starting with detected devices
-            menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {}
-            for index, device in enumerate(detected_devices, start=1):
-                menu_items[index] = Menu.Item(
-                    f"Select {device}", lambda device=device: self.select_device(device)
+            builder = MenuBuilder()
+            for device in detected_devices:
+                builder.add(
+                    Menu.Item(
+                        f"Select {device}",
+                        lambda device=device: self.select_device(device),
+                    )
                 )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
+            builder.add(Menu.Separator())
             # Add static options after the device options
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                "Check Again", self.query_devices
-            )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[len(menu_items) + 1] = Menu.Item("Back", self.menu)
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                Utils.colored_text("Back to main menu", Color.CYAN),
-                self.firmware.main_menu,
+            builder.add(Menu.Item("Check Again", self.query_devices))
+            builder.add(Menu.Separator())
+            builder.add(Menu.Item("Back", self.menu))
+            builder.add(
+                Menu.Item(
+                    _LBL_BACK_TO_MAIN,
+                    self.firmware.main_menu,
+                )
             )
             # Add the Exit option explicitly
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[0] = Menu.Item("Exit", lambda: exit())
+            builder.add(Menu.Separator())
+            builder.menu_items[0] = _EXIT_ITEM
 
             # Create and display the menu
-            menu = Menu("Options", menu_items)
+            menu = Menu("Options", builder.menu_items)
             menu.display()
 
     def menu(self) -> None:
@@ -1474,35 +1619,38 @@ class Usb:
         self.selected_device = self.firmware.get_device()
         self.selected_firmware = self.firmware.get_firmware()
         # Base menu items
-        menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {
-            1: Menu.Item("Find Cartographer Device", self.query_devices),
-            2: Menu.Item(
+        builder = MenuBuilder()
+        builder.add(Menu.Item("Find Cartographer Device", self.query_devices))
+        builder.add(
+            Menu.Item(
                 "Find USB Firmware",
                 lambda: self.firmware.firmware_menu(type=FlashMethod.USB),
-            ),
-        }
+            )
+        )
 
         # Dynamically add "Flash Selected Firmware" if conditions are met
         if self.selected_firmware and self.selected_device:
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                "Flash Selected Firmware",
-                lambda: self.firmware.confirm(type=FlashMethod.USB),
+            builder.add(Menu.Separator())
+            builder.add(
+                Menu.Item(
+                    "Flash Selected Firmware",
+                    lambda: self.firmware.confirm(type=FlashMethod.USB),
+                )
             )
-        menu_items[len(menu_items) + 1] = Menu.Separator()
+        builder.add(Menu.Separator())
         # Add "Back to main menu" after "Flash Selected Firmware"
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            Utils.colored_text("Back to main menu", Color.CYAN), self.firmware.main_menu
-        )
-        menu_items[len(menu_items) + 1] = Menu.Separator()
+        builder.add(Menu.Item(_LBL_BACK_TO_MAIN, self.firmware.main_menu))
+        builder.add(Menu.Separator())
         # Add exit option explicitly at the end
-        menu_items[0] = Menu.Item("Exit", lambda: exit())
+        builder.menu_items[0] = _EXIT_ITEM
 
         # Create and display the menu
-        menu = Menu("What would you like to do?", menu_items)
+        menu = Menu("What would you like to do?", builder.menu_items)
         menu.display()
 
     def flash_device(self, firmware_file: str, device: str):
+        import subprocess
+
         try:
             # Validate selected device and firmware
             self.validator.check_selected_device()
@@ -1510,7 +1658,7 @@ class Usb:
 
             # Check if the device is already a Katapult device
             if "katapult" in device.lower():
-                katapult_device = f"/dev/serial/by-id/{device}"
+                katapult_device = f"{SERIAL_BY_ID_DIR}{device}"
             else:
                 # Validate that the device is a valid Cartographer device
                 if not self.validator.validate_device(device, FlashMethod.USB):
@@ -1518,7 +1666,7 @@ class Usb:
                     self.menu()
 
                 # Prepend device path for Cartographer
-                device = f"/dev/serial/by-id/{device}"
+                device = f"{SERIAL_BY_ID_DIR}{device}"
 
                 # Enter bootloader for the device
                 bootloader_cmd = [
@@ -1532,16 +1680,16 @@ class Usb:
                     check=True,
                     cwd=os.path.expanduser("~/klipper/scripts"),
                 )
-                sleep(5)
-
-                # Perform ls to find Katapult device
-                base_path = "/dev/serial/by-id/"
+                # Wait for the Katapult device to show up, rather than
+                # sleeping for a fixed time
                 katapult_device = None
-                if os.path.exists(base_path):
-                    for item in os.listdir(base_path):
-                        if "katapult" in item.lower():
-                            katapult_device = f"{base_path}{item}"
-                            break
+                deadline = time.monotonic() + KATAPULT_ENUMERATE_TIMEOUT
+                while time.monotonic() < deadline:
+                    katapult_devices = Utils.scan_by_id(("katapult",))
+                    if katapult_devices:
+                        katapult_device = f"{SERIAL_BY_ID_DIR}{katapult_devices[0]}"
+                        break
+                    time.sleep(0.15)
 
                 if not katapult_device:
                     Utils.error_msg(
@@ -1561,31 +1709,15 @@ class Usb:
                 katapult_device,  # Selected device UUID
             ]
 
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-            )
-
             # Print stdout as it happens
-            if process.stdout is not None:
-                for line in process.stdout:
-                    print(line.strip())
-
-            # Wait for the process to complete
-            _ = process.wait()
+            returncode, stderr_output = Utils.run_streaming(command)
 
             # Check if the process completed successfully
-            if process.returncode == 0:
+            if returncode == 0:
                 _ = input("Press enter to continue..")
                 self.firmware.flash_success("Firmware flashed successfully.")
             else:
-                stderr_output = (
-                    process.stderr.read().strip()
-                    if process.stderr is not None
-                    else "No error details available."
-                )
+                stderr_output = stderr_output or "No error details available."
                 _ = input("Press enter to continue..")
                 self.firmware.flash_fail(f"Error flashing firmware: {stderr_output}")
 
@@ -1609,15 +1741,73 @@ class Dfu:
         self.ftype: bool = ftype
         self.selected_device: Optional[str] = None
         self.selected_firmware: Optional[str] = None
+        # Options listed under the detected devices, the same on every query
+        self._query_tail: Tuple[Union[Menu.Item, Menu.Separator], ...] = (
+            Menu.Separator(),
+            Menu.Item("Check Again", self.query_devices),
+            Menu.Separator(),
+            Menu.Item("Back", self.menu),
+            Menu.Item(_LBL_BACK_TO_MAIN, self.firmware.main_menu),
+            Menu.Separator(),
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def has_dfu_util() -> bool:
+        import shutil
+
+        return shutil.which("dfu-util") is not None
 
     def check_dfu_util(self) -> bool:
-        if shutil.which("dfu-util"):
+        # Cached, DfuInstaller clears it after installing dfu-util
+        if Dfu.has_dfu_util():
             return True
         else:
             print("dfu-util is not installed. Please install it and try again.")
             return False
 
+    def scan_dfu_sysfs(self) -> Optional[List[str]]:
+        """
+        List the vendor:product ids of USB devices exposing a DFU interface,
+        read straight from sysfs. Returns None when sysfs isn't available.
+        """
+
+        def read_attr(entry: str, attr: str) -> str:
+            with open(os.path.join(SYSFS_USB_DIR, entry, attr)) as f:
+                return f.read().strip()
+
+        try:
+            with os.scandir(SYSFS_USB_DIR) as entries:
+                names = tuple(sorted(entry.name for entry in entries))
+        except OSError:
+            return None
+
+        devices: dict[str, None] = {}
+        for name in names:
+            # Interfaces are named "<device>:<config>.<interface>"
+            device, sep, _ = name.partition(":")
+            if not sep:
+                continue
+            try:
+                # Application specific class (0xfe), DFU subclass (0x01),
+                # DFU mode protocol (0x02) rather than a runtime interface
+                if (
+                    read_attr(name, "bInterfaceClass") != "fe"
+                    or read_attr(name, "bInterfaceSubClass") != "01"
+                    or read_attr(name, "bInterfaceProtocol") != "02"
+                ):
+                    continue
+                vendor = read_attr(device, "idVendor")
+                product = read_attr(device, "idProduct")
+            except OSError:
+                continue
+            _ = devices.setdefault(f"{vendor}:{product}")
+
+        return list(devices)
+
     def dfu_loop(self) -> List[str]:
+        import subprocess
+
         start_time = time.time()
         timeout = 30  # Timeout in seconds
 
@@ -1625,19 +1815,20 @@ class Dfu:
 
         try:
             while time.time() - start_time < timeout:
-                # Run the `lsusb` command
-                result = subprocess.run(
-                    ["lsusb"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-                )
-                lines = result.stdout.splitlines()
-
-                # Parse all lines containing "DFU Mode"
-                for line in lines:
-                    if "DFU Mode" in line:
-                        # Extract the device ID (the 6th field in `lsusb` output)
-                        device_id: str = line.split()[
-                            5
-                        ]  # Assuming field 6 contains the ID
+                sysfs_devices = self.scan_dfu_sysfs()
+                if sysfs_devices is not None:
+                    for device_id in sysfs_devices:
+                        detected_devices.append(device_id)
+                        print(f"Detected DFU device: {device_id}")
+                else:
+                    # No sysfs, fall back to running `lsusb`
+                    result = subprocess.run(
+                        ["lsusb"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+                    )
+
+                    # Pick the vendor:product ID out of every "DFU Mode" line
+                    for match in _LSUSB_DFU_RE.finditer(result.stdout):
+                        device_id = match.group(1).decode()
                         detected_devices.append(device_id)  # Add to the list
                         print(f"Detected DFU device: {device_id}")
                 if detected_devices:
@@ -1673,7 +1864,7 @@ class Dfu:
                     self.menu,
                 ),
                 3: Menu.Separator(),  # Blank separator
-                0: Menu.Item("Exit", lambda: exit()),  # Add exit option explicitly
+                0: _EXIT_ITEM,  # Add exit option explicitly
             }
 
             # Create and display the menu
@@ -1690,28 +1881,22 @@ class Dfu:
                 Utils.success_msg("DFU Device Found")
 
             # Define menu items, starting with detected devices
-            menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {}
-            for index, device in enumerate(detected_devices, start=1):
-                menu_items[index] = Menu.Item(
-                    f"Select {device}", lambda device=device: self.select_device(device)
+            builder = MenuBuilder()
+            for device in detected_devices:
+                builder.add(
+                    Menu.Item(
+                        f"Select {device}",
+                        lambda device=device: self.select_device(device),
+                    )
                 )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
             # Add static options after the device options
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                "Check Again", self.query_devices
-            )
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[len(menu_items) + 1] = Menu.Item("Back", self.menu)
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                Utils.colored_text("Back to main menu", Color.CYAN),
-                self.firmware.main_menu,
-            )
+            for item in self._query_tail:
+                builder.add(item)
             # Add the Exit option explicitly
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[0] = Menu.Item("Exit", lambda: exit())
+            builder.menu_items[0] = _EXIT_ITEM
 
             # Create and display the menu
-            menu = Menu("Options", menu_items)
+            menu = Menu("Options", builder.menu_items)
             menu.display()
 
     def select_device(self, device: str):
@@ -1726,35 +1911,38 @@ class Dfu:
         self.selected_device = self.firmware.get_device()
         self.selected_firmware = self.firmware.get_firmware()
         # Base menu items
-        menu_items: Dict[int, Union[Menu.Item, Menu.Separator]] = {
-            1: Menu.Item("Find Cartographer Device", self.query_devices),
-            2: Menu.Item(
+        builder = MenuBuilder()
+        builder.add(Menu.Item("Find Cartographer Device", self.query_devices))
+        builder.add(
+            Menu.Item(
                 "Find DFU Firmware",
                 lambda: self.firmware.firmware_menu(type=FlashMethod.DFU),
-            ),
-        }
+            )
+        )
 
         # Dynamically add "Flash Selected Firmware" if conditions are met
         if self.selected_firmware and self.selected_device:
-            menu_items[len(menu_items) + 1] = Menu.Separator()
-            menu_items[len(menu_items) + 1] = Menu.Item(
-                "Flash Selected Firmware",
-                lambda: self.firmware.confirm(type=FlashMethod.DFU),
+            builder.add(Menu.Separator())
+            builder.add(
+                Menu.Item(
+                    "Flash Selected Firmware",
+                    lambda: self.firmware.confirm(type=FlashMethod.DFU),
+                )
             )
-        menu_items[len(menu_items) + 1] = Menu.Separator()
+        builder.add(Menu.Separator())
         # Add "Back to main menu" after "Flash Selected Firmware"
-        menu_items[len(menu_items) + 1] = Menu.Item(
-            Utils.colored_text("Back to main menu", Color.CYAN), self.firmware.main_menu
-        )
-        menu_items[len(menu_items) + 1] = Menu.Separator()
+        builder.add(Menu.Item(_LBL_BACK_TO_MAIN, self.firmware.main_menu))
+        builder.add(Menu.Separator())
         # Add exit option explicitly at the end
-        menu_items[0] = Menu.Item("Exit", lambda: exit())
+        builder.menu_items[0] = _EXIT_ITEM
 
         # Create and display the menu
-        menu = Menu("What would you like to do?", menu_items)
+        menu = Menu("What would you like to do?", builder.menu_items)
         menu.display()
 
     def flash_device(self, firmware_file: str, device: str):
+        import subprocess
+
         try:
             # Validate selected device and firmware
             self.validator.check_selected_device()
@@ -1780,43 +1968,18 @@ class Dfu:
                 firmware_file,  # Firmware file path
             ]
 
-            # Run the dfu-util command as a subprocess
-            process = subprocess.Popen(
-                command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-            )
-
-            # Print stdout as it happens
-            if process.stdout is not None:
-                for line in process.stdout:
-                    print(line.strip())
-
-            # Wait for the process to complete
-            _ = process.wait()
-
-            # Check stderr for known warnings to ignore
-            stderr_output = (
-                process.stderr.read().strip() if process.stderr is not None else ""
-            )
-
-            # Define warnings to ignore
-            ignored_warnings = [
-                "Invalid DFU suffix signature",
-                "can't detach",
-                "A valid DFU suffix",
-            ]
+            # Run the dfu-util command, printing stdout as it happens
+            returncode, stderr_output = Utils.run_streaming(command)
 
             # Filter out ignored warnings
             filtered_stderr = "\n".join(
                 line
                 for line in stderr_output.splitlines()
-                if not any(warning in line for warning in ignored_warnings)
+                if not _DFU_IGNORED_WARNINGS_RE.search(line)
             )
 
             # If returncode is 0 or all errors are ignored warnings, treat as success
-            if process.returncode == 0 or (not filtered_stderr):
+            if returncode == 0 or (not filtered_stderr):
                 _ = input("Press enter to continue..")
                 self.firmware.flash_success("Firmware flashed successfully.")
             else:
@@ -1836,6 +1999,8 @@ class Dfu:
 
 class RetrieveFirmware:
     def __init__(self, firmware: Firmware, branch: str = "master", debug: bool = False):
+        import tempfile
+
         self.firmware: Firmware = firmware
         self.branch: str = branch
         self.debug: bool = debug
@@ -1849,20 +2014,30 @@ class RetrieveFirmware:
         if os.path.exists(self.temp_dir):
             if self.debug:
                 print(f"Directory exists: {self.temp_dir}")
-            subdirs = [
-                os.path.join(self.temp_dir, d)
-                for d in os.listdir(self.temp_dir)
-                if os.path.isdir(os.path.join(self.temp_dir, d))
-            ]
+            # Known from extraction, only look for it when that didn't record one
+            if self.extracted_dir is None or not os.path.isdir(self.extracted_dir):
+                self.extracted_dir = self.first_subdir(self.temp_dir)
             if self.debug:
-                print(f"Subdirectories found: {subdirs}")
-            if subdirs:
-                return subdirs[0]
+                print(f"Subdirectory found: {self.extracted_dir}")
+            if self.extracted_dir:
+                return self.extracted_dir
         if self.debug:
             print("No subdirectories found.")
         return None
 
+    @staticmethod
+    def first_subdir(path: str) -> Optional[str]:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    return entry.path
+        return None
+
     def clean_temp_dir(self):
+        import shutil
+
+        self.extracted_dir = None
+
         if os.path.exists(self.temp_dir):
             if self.debug:
                 print(f"Cleaning temporary directory: {self.temp_dir}")
@@ -1870,60 +2045,72 @@ class RetrieveFirmware:
         os.makedirs(self.temp_dir, exist_ok=True)
 
     def download_and_extract(self):
+        import tarfile
+        import urllib.request
+
+        root = os.path.realpath(self.temp_dir)
+
+        def inside(path: str) -> bool:
+            return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+        def checked_members(archive: tarfile.TarFile) -> Iterator[tarfile.TarInfo]:
+            # Stands in for tarfile.data_filter on Pythons that don't have it,
+            # refusing anything that would be written outside the temp dir
+            for member in archive:
+                name, link = member.name, member.linkname
+                if os.path.isabs(name) or ".." in name.split("/"):
+                    raise tarfile.TarError(f"Unsafe path in archive: {name}")
+                if member.issym() or member.islnk():
+                    # Symlinks are relative to their own directory, hard links
+                    # to the archive root
+                    base = os.path.dirname(name) if member.issym() else ""
+                    if (
+                        os.path.isabs(link)
+                        or ".." in link.split("/")
+                        or not inside(os.path.join(root, base, link))
+                    ):
+                        raise tarfile.TarError(f"Unsafe link in archive: {name}")
+                # Catches writing through a symlink extracted earlier
+                if not inside(os.path.join(root, name)):
+                    raise tarfile.TarError(f"Unsafe path in archive: {name}")
+                yield member
+
         try:
-            # Define the path for the downloaded tarball
-            tarball_path = os.path.join(self.temp_dir, "firmware.tar.gz")
-
-            print("Downloading tarball...")
-            # Use curl to save the tarball to a file
-            with open(os.devnull, "w") as devnull:
-                curl_command = [
-                    "curl",
-                    "-L",
-                    self.tarball_url,
-                    "--output",
-                    tarball_path,
-                ]
-                _ = subprocess.run(
-                    curl_command,
-                    stdout=devnull if not self.debug else None,
-                    stderr=devnull,
-                    check=True,
-                )
+            print("Downloading and extracting tarball...")
+            # Extract the download in-process as it streams in, so the archive
+            # never touches the disk and no curl or tar process is needed
+            request = urllib.request.Request(
+                self.tarball_url,
+                headers={"User-Agent": f"cartographer-firmware/{FLASHER_VERSION}"},
+            )
+            with urllib.request.urlopen(request, timeout=60) as response, tarfile.open(
+                fileobj=response, mode="r|gz"
+            ) as archive:
+                if hasattr(tarfile, "data_filter"):
+                    archive.extraction_filter = tarfile.data_filter
+                    archive.extractall(self.temp_dir)
+                else:
+                    archive.extractall(self.temp_dir, members=checked_members(archive))
+                # GitHub tarballs hold everything under one top level directory
+                members = archive.getmembers()
 
-            print("Extracting tarball...")
-            # Extract the tarball into the temporary directory
-            with open(os.devnull, "w") as devnull:
-                tar_command = ["tar", "-xz", "-C", self.temp_dir, "-f", tarball_path]
-                _ = subprocess.run(
-                    tar_command,
-                    stdout=devnull if not self.debug else None,
-                    stderr=devnull,
-                    check=True,
+            if not members:
+                return Utils.error_msg(
+                    "No directories found in the temporary directory after extraction."
                 )
+            self.extracted_dir = os.path.join(
+                self.temp_dir, members[0].name.split("/")[0]
+            )
+            if self.debug:
+                Utils.success_msg(f"Extracted directory: {self.extracted_dir}")
 
-        except subprocess.CalledProcessError as e:
+        except (OSError, tarfile.TarError) as e:  # URLError is an OSError
             return Utils.error_msg(f"Error downloading or extracting tarball: {e}")
 
-    def find_extracted_dir(self):
-        dirs = [
-            os.path.join(self.temp_dir, d)
-            for d in os.listdir(self.temp_dir)
-            if os.path.isdir(os.path.join(self.temp_dir, d))
-        ]
-        if not dirs:
-            return Utils.error_msg(
-                "No directories found in the temporary directory after extraction."
-            )
-        self.extracted_dir = dirs[0]
-        if self.debug:
-            Utils.success_msg(f"Extracted directory: {self.extracted_dir}")
-
     def main(self):
         try:
             self.clean_temp_dir()
             self.download_and_extract()
-            self.find_extracted_dir()
             if self.debug:
                 Utils.success_msg(
                     f"Firmware from branch '{self.branch}' has been retrieved and prepared."
@@ -1940,14 +2127,18 @@ class KatapultInstaller:
         :param device_menu: A callable to return to the device menu.
         """
         self.device_menu: Callable[[], None] = device_menu
+        self._installed: bool = False
 
     def install(self) -> None:
         """
         Installs Katapult by cloning the repository to the specified directory.
         """
+        import subprocess
+
         try:
             # Check if Katapult is already installed
-            if os.path.exists(KATAPULT_DIR):
+            if self._installed or os.path.exists(KATAPULT_DIR):
+                self._installed = True
                 Utils.error_msg(
                     f"Katapult is already installed at {KATAPULT_DIR}.",
                 )
@@ -1963,6 +2154,7 @@ class KatapultInstaller:
 
             print("Cloning the Katapult repository...")
             _ = subprocess.run(command, check=True, text=True)
+            self._installed = True
 
             Utils.success_msg(
                 f"Katapult has been successfully installed in {KATAPULT_DIR}."
@@ -1987,12 +2179,36 @@ class DfuInstaller:
         """
         self.device_menu: Callable[[], None] = device_menu
 
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def find_package_managers() -> FrozenSet[str]:
+        """
+        Scan PATH once for the package managers install() knows how to use.
+        """
+        found: set[str] = set()
+        for directory in os.environ.get("PATH", os.defpath).split(os.pathsep):
+            try:
+                with os.scandir(directory or os.curdir) as entries:
+                    for entry in entries:
+                        if (
+                            entry.name in {"apt", "yum", "dnf", "pacman"}
+                            and entry.is_file()
+                            and os.access(entry.path, os.X_OK)
+                        ):
+                            found.add(entry.name)
+            except OSError:
+                continue
+        return frozenset(found)
+
     def install(self) -> None:
         """
         Installs DFU Util
         """
+        import subprocess
+
+        package_managers = DfuInstaller.find_package_managers()
         try:
-            if shutil.which("apt"):
+            if "apt" in package_managers:
                 Utils.success_msg(
                     "Detected apt package manager. Installing dfu-util..."
                 )
@@ -2000,21 +2216,21 @@ class DfuInstaller:
                 _ = subprocess.run(
                     ["sudo", "apt", "install", "dfu-util", "-y"], check=True
                 )
-            elif shutil.which("yum"):
+            elif "yum" in package_managers:
                 Utils.success_msg(
                     "Detected yum package manager. Installing dfu-util..."
                 )
                 _ = subprocess.run(
                     ["sudo", "yum", "install", "dfu-util", "-y"], check=True
                 )
-            elif shutil.which("dnf"):
+            elif "dnf" in package_managers:
                 Utils.success_msg(
                     "Detected dnf package manager. Installing dfu-util..."
                 )
                 _ = subprocess.run(
                     ["sudo", "dnf", "install", "dfu-util", "-y"], check=True
                 )
-            elif shutil.which("pacman"):
+            elif "pacman" in package_managers:
                 Utils.success_msg(
                     "Detected pacman package manager. Installing dfu-util..."
                 )
@@ -2027,6 +2243,7 @@ class DfuInstaller:
                 )
                 self.device_menu()
 
+            Dfu.has_dfu_util.cache_clear()
             Utils.success_msg("dfu-util installed successfully.")
 
         except subprocess.CalledProcessError as e:
@@ -2117,4 +2334,4 @@ if __name__ == "__main__":
             fw.handle_initialization()
     except KeyboardInterrupt:
         print("\nProcess interrupted by user. Exiting...")
-        exit(0)
+        sys.exit(0)
@@ -0,0 +1,61 @@
+# Load scanner.py outside of Klipper. The klippy modules and extras it imports
+# are only available inside a Klipper install, so they are replaced with empty
+# modules; the tests only exercise the numeric helpers that don't touch them.
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "cartographer_extras"
+KLIPPY_MODULES = (
+    "chelper",
+    "msgproto",
+    "pins",
+    "clocksync",
+    "configfile",
+    "gcode",
+    "klippy",
+    "mcu",
+    "stepper",
+    "webhooks",
+)
+EXTRAS_MODULES = (
+    "adxl345",
+    "bed_mesh",
+    "manual_probe",
+    "probe",
+    "temperature_sensor",
+    "thermistor",
+)
+
+
+def _stub_module(name):
+    module = types.ModuleType(name)
+    module.__getattr__ = lambda attr: type(attr, (), {})
+    return module
+
+
+# pytest imports the repository's __init__.py as well, which imports the
+# extras by their top level names
+for _name in KLIPPY_MODULES + EXTRAS_MODULES:
+    sys.modules.setdefault(_name, _stub_module(_name))
+
+
+@pytest.fixture(scope="session")
+def scanner():
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = []
+    sys.modules[PACKAGE] = package
+    for name in EXTRAS_MODULES:
+        setattr(package, name, sys.modules[name])
+        sys.modules[f"{PACKAGE}.{name}"] = sys.modules[name]
+    spec = importlib.util.spec_from_file_location(
+        f"{PACKAGE}.scanner", ROOT / "scanner.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
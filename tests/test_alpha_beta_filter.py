@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def stream():
+    rng = np.random.default_rng(7)
+    times = np.cumsum(rng.uniform(0.0005, 0.0015, 300)) + 100.0
+    # Repeated timestamps exercise the dt == 0 path
+    times[50] = times[49]
+    # Raw sensor counts, as the stream hands them over
+    measurements = 12_000_000 + 5_000 * np.sin(times * 40.0) + rng.normal(0, 50, 300)
+    return times.tolist(), measurements.astype(int).tolist()
+
+
+def test_update_batch_matches_update(scanner, stream):
+    times, measurements = stream
+    scalar = scanner.AlphaBetaFilter(0.5, 1e-5)
+    batch = scanner.AlphaBetaFilter(0.5, 1e-5)
+
+    expected = [scalar.update(t, m) for t, m in zip(times, measurements)]
+    smoothed = batch.update_batch(times, measurements)
+
+    assert smoothed == expected
+    assert (batch.xl, batch.vl, batch.tl) == (scalar.xl, scalar.vl, scalar.tl)
+
+
+def test_update_batch_continues_a_stream(scanner, stream):
+    times, measurements = stream
+    scalar = scanner.AlphaBetaFilter(0.5, 1e-5)
+    batch = scanner.AlphaBetaFilter(0.5, 1e-5)
+
+    expected = [scalar.update(t, m) for t, m in zip(times, measurements)]
+    smoothed = []
+    for start in range(0, len(times), 64):
+        smoothed += batch.update_batch(
+            times[start : start + 64], measurements[start : start + 64]
+        )
+
+    assert smoothed == expected
+
+
+def test_update_batch_empty(scanner):
+    abf = scanner.AlphaBetaFilter(0.5, 1e-5)
+
+    assert abf.update_batch([], []) == []
+    assert abf.value() is None
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def test_fills_plane_exactly(scanner):
+    grid_y, grid_x = np.indices((20, 30))
+    bed = 0.01 * grid_x - 0.02 * grid_y + 0.3
+    fill = np.zeros(bed.shape, dtype=bool)
+    fill[5:12, 8:20] = True
+    fill[0:4, 0:3] = True
+    holed = bed.copy()
+    holed[fill] = np.nan
+
+    filled = scanner.inpaint_harmonic(holed, fill)
+
+    np.testing.assert_allclose(filled, bed, atol=1e-9)
+
+
+def test_hole_without_measured_neighbour_stays_empty(scanner):
+    matrix = np.full((5, 10), np.nan)
+    matrix[:, 6:] = 0.5
+    fill = np.zeros(matrix.shape, dtype=bool)
+    fill[1:4, 1:4] = True
+    fill[1:4, 7:9] = True
+
+    filled = scanner.inpaint_harmonic(matrix, fill)
+
+    assert np.isnan(filled[1:4, 1:4]).all()
+    np.testing.assert_allclose(filled[1:4, 7:9], 0.5)
+
+
+def test_large_hole_is_solved_sparse(scanner, monkeypatch):
+    from scipy import sparse
+    from scipy.sparse import linalg as sparse_linalg
+
+    systems = []
+    spsolve = sparse_linalg.spsolve
+
+    def record(a, b):
+        systems.append(a)
+        return spsolve(a, b)
+
+    monkeypatch.setattr(sparse_linalg, "spsolve", record)
+    # A 200x200 hole is 40000 unknowns, a dense system would need 12.8 GB
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(0.0, 0.01, (240, 240))
+    fill = np.zeros(matrix.shape, dtype=bool)
+    fill[20:220, 20:220] = True
+    matrix[fill] = np.nan
+
+    filled = scanner.inpaint_harmonic(matrix, fill)
+
+    assert not np.isnan(filled).any()
+    (a,) = systems
+    assert sparse.issparse(a)
+    assert a.shape == (40000, 40000)
+    # Five-point stencil, at most five entries per row
+    assert a.nnz <= 5 * 40000
@@ -0,0 +1,110 @@
+import math
+import statistics
+import types
+
+import numpy as np
+import pytest
+
+RES_X, RES_Y = 7, 5
+MIN_X, MIN_Y = 10.0, 20.0
+STEP_X, STEP_Y = 15.0, 12.5
+ZERO_REF = (40.0, 45.0)
+
+
+def _helper(scanner):
+    helper = object.__new__(scanner.ScannerMeshHelper)
+    helper.scanner = types.SimpleNamespace(trigger_distance=2.0)
+    helper.res_x, helper.res_y = RES_X, RES_Y
+    helper.min_x, helper.min_y = MIN_X, MIN_Y
+    helper.max_x = MIN_X + (RES_X - 1) * STEP_X
+    helper.max_y = MIN_Y + (RES_Y - 1) * STEP_Y
+    helper.step_x, helper.step_y = STEP_X, STEP_Y
+    helper.zero_ref_mode = ("pos", ZERO_REF)
+    helper.zero_ref_bin = []
+    return helper
+
+
+def _bin_scalar(helper, dists, xs, ys, cs, zcs):
+    # Per-sample binning as the streaming callback used to do it
+    clusters = {}
+    zero_ref_bin = []
+    invalid_samples = 0
+    for d, x, y in zip(dists.tolist(), xs.tolist(), ys.tolist()):
+        if math.isinf(d):
+            if helper._is_valid_position(x, y):
+                invalid_samples += 1
+            continue
+        xi = round((x - helper.min_x) / helper.step_x)
+        yi = round((y - helper.min_y) / helper.step_y)
+        if xi < 0 or helper.res_x <= xi or yi < 0 or helper.res_y <= yi:
+            continue
+        if cs > 0:
+            dx = x - (xi * helper.step_x + helper.min_x)
+            dy = y - (yi * helper.step_y + helper.min_y)
+            if math.sqrt(dx * dx + dy * dy) > cs:
+                continue
+        if zcs > 0:
+            dx = x - ZERO_REF[0]
+            dy = y - ZERO_REF[1]
+            if math.sqrt(dx * dx + dy * dy) <= zcs:
+                zero_ref_bin.append(d)
+        clusters.setdefault((xi, yi), []).append(d)
+    return clusters, zero_ref_bin, invalid_samples
+
+
+def _as_dict(clusters):
+    out = {}
+    start = 0
+    for cell, count in zip(clusters.cells.tolist(), clusters.counts.tolist()):
+        out[(cell % RES_X, cell // RES_X)] = clusters.dists[start : start + count]
+        start += count
+    return out
+
+
+def _samples(n, nan=False):
+    rng = np.random.default_rng(11)
+    # Cover the mesh plus a margin, so some samples fall outside of it
+    xs = rng.uniform(MIN_X - 20.0, MIN_X + RES_X * STEP_X + 10.0, n)
+    ys = rng.uniform(MIN_Y - 20.0, MIN_Y + RES_Y * STEP_Y + 10.0, n)
+    dists = rng.uniform(1.5, 2.5, n)
+    dists[rng.random(n) < 0.05] = math.inf
+    if nan:
+        dists[rng.random(n) < 0.05] = math.nan
+    return dists, xs, ys
+
+
+@pytest.mark.parametrize("cs, zcs", [(0.0, 0.0), (4.0, 0.0), (0.0, 6.0), (4.0, 6.0)])
+def test_bin_samples_matches_scalar(scanner, cs, zcs):
+    helper = _helper(scanner)
+    dists, xs, ys = _samples(5000, nan=True)
+
+    clusters, invalid_samples = helper._bin_samples(dists, xs, ys, cs, zcs)
+
+    expected, zero_ref_bin, expected_invalid = _bin_scalar(
+        helper, dists, xs, ys, cs, zcs
+    )
+    assert invalid_samples == expected_invalid
+    np.testing.assert_array_equal(helper.zero_ref_bin, zero_ref_bin)
+    actual = _as_dict(clusters)
+    assert actual.keys() == expected.keys()
+    for key, values in expected.items():
+        np.testing.assert_array_equal(actual[key], values)
+
+
+def test_generate_matrix_matches_scalar(scanner):
+    helper = _helper(scanner)
+    dists, xs, ys = _samples(5000)
+    # Leave one cell without samples
+    empty = (xs > MIN_X + 2.5 * STEP_X) & (xs < MIN_X + 3.5 * STEP_X)
+    empty &= (ys > MIN_Y + 1.5 * STEP_Y) & (ys < MIN_Y + 2.5 * STEP_Y)
+    dists, xs, ys = dists[~empty], xs[~empty], ys[~empty]
+
+    clusters, _ = helper._bin_samples(dists, xs, ys, 4.0, 0.0)
+    matrix, faulty = helper._generate_matrix(clusters, None)
+
+    expected, _, _ = _bin_scalar(helper, dists, xs, ys, 4.0, 0.0)
+    assert faulty is None
+    assert np.isnan(matrix[2, 3])
+    assert np.count_nonzero(~np.isnan(matrix)) == len(expected)
+    for (xi, yi), values in expected.items():
+        assert matrix[yi, xi] == 2.0 - statistics.median(values)
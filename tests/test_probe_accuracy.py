@@ -0,0 +1,50 @@
+import dataclasses
+import math
+import statistics
+
+import numpy as np
+import pytest
+
+
+def _summarize_scalar(zs):
+    # The statistics as the probe accuracy check used to compute them
+    median_ = statistics.median(zs)
+    avg_value = sum(zs) / len(zs)
+    in_range = early = late = 0
+    for z in zs:
+        if abs(median_ - z) < 0.05:
+            in_range += 1
+        elif z > median_:
+            early += 1
+        else:
+            late += 1
+    sigma = math.sqrt(sum((z - avg_value) ** 2 for z in zs) / len(zs))
+    return {
+        "max_value": max(zs),
+        "min_value": min(zs),
+        "range_value": max(zs) - min(zs),
+        "avg_value": avg_value,
+        "median": median_,
+        "sigma": sigma,
+        "in_range": in_range,
+        "early": early,
+        "late": late,
+        "nb_samples": len(zs),
+    }
+
+
+@pytest.mark.parametrize("count", [1, 2, 9, 10, 101])
+def test_summarize_samples_matches_scalar(scanner, count):
+    rng = np.random.default_rng(count)
+    # Wide enough that samples land early, late and in range
+    zs = rng.normal(0.0, 0.06, count).tolist()
+
+    result = dataclasses.asdict(scanner.summarize_samples(zs))
+
+    expected = _summarize_scalar(zs)
+    assert result.keys() == expected.keys()
+    for key in ("max_value", "min_value", "median", "in_range", "early", "late"):
+        assert result[key] == expected[key], key
+    for key in ("range_value", "avg_value", "sigma"):
+        assert result[key] == pytest.approx(expected[key], rel=1e-12, abs=1e-15)
+    assert result["nb_samples"] == count
@@ -0,0 +1,42 @@
+import types
+
+import numpy as np
+import pytest
+
+
+class CommandError(Exception):
+    pass
+
+
+def _model(scanner, coef, domain=(0.0, 1.0)):
+    printer = types.SimpleNamespace(command_error=CommandError)
+    poly = np.polynomial.Polynomial(coef, domain)
+    return scanner.ScannerModel(
+        "test",
+        types.SimpleNamespace(printer=printer),
+        poly,
+        None,
+        -1.0,
+        5.0,
+        "test",
+        0.0,
+        "UNKNOWN",
+    )
+
+
+def test_dist_to_freq_raw_inverts_model(scanner):
+    model = _model(scanner, [1.0, 2.0, 0.5], domain=(2e-7, 4e-7))
+
+    freq = model.dist_to_freq_raw(1.7)
+
+    assert model.freq_to_dist_raw(freq) == pytest.approx(1.7, abs=1e-7)
+
+
+@pytest.mark.filterwarnings("error")
+def test_dist_to_freq_raw_flat_bracket(scanner):
+    # Both ends of a constant model sit on the target, so regula falsi has
+    # no slope to work with and must fall back to bisection
+    model = _model(scanner, [0.0])
+
+    with pytest.raises(CommandError):
+        model.dist_to_freq_raw(0.0, max_e=0.0)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+
+def test_compensate_fallback_skips_closed_form(scanner):
+    # With a_a == a_b == 0 the discriminant rounds just below zero and the
+    # closed form would divide by a zero param_a
+    b_a, b_b = 0.1, 0.3
+    model = scanner.ScannerTempModel(0.0, 0.0, b_a, b_b, 2.9e6, 30.0)
+    freq, temp_source, temp_target = 3.0e6, 40.0, 60.0
+
+    lin_b = b_a * (freq - 2.9e6) + b_b
+    expected = freq + lin_b * (temp_target - temp_source)
+
+    assert model.compensate(freq, temp_source, temp_target) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        # Only the closed form
+        (1e-4, -2e-3, -0.5, 30.0, 2.9e6, 30.0),
+        # A mix of closed form and linear fallback samples
+        (-1e-4, 2e-3, 0.5, -30.0, 2.9e6, 30.0),
+    ],
+)
+def test_compensate_batch_matches_scalar(scanner, params):
+    model = scanner.ScannerTempModel(*params)
+    rng = np.random.default_rng(3)
+    freqs = rng.uniform(2.9e6, 3.3e6, 200)
+    temps = rng.uniform(20.0, 80.0, 200)
+
+    batch = model.compensate_batch(freqs, temps, 45.0)
+
+    expected = [model.compensate(f, t, 45.0) for f, t in zip(freqs, temps)]
+    np.testing.assert_allclose(batch, expected, rtol=1e-10)
+
+
+def test_compensate_batch_without_model(scanner):
+    model = scanner.ScannerTempModel(None, None, None, None, None, None)
+    freqs = [3.0e6, 3.1e6]
+
+    np.testing.assert_array_equal(model.compensate_batch(freqs, 40.0, 60.0), freqs)